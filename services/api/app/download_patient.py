@@ -3,11 +3,23 @@ Utility to download a single PortPy patient from Hugging Face if not present loc
 """
 from __future__ import annotations
 
+import importlib.util
+import json
+import os
+import shutil
 from pathlib import Path
+from typing import List, Optional, Set
+
+# Use the Rust multi-connection downloader when it is installed; huggingface_hub reads
+# this flag at import time and errors out if it is set without hf_transfer present.
+if importlib.util.find_spec("hf_transfer") is not None:
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
 
 from huggingface_hub import snapshot_download
 
 DATASET_REPO = "PortPy-Project/PortPy_Dataset"
+DOWNLOAD_WORKERS = 8
+READY_FILE = ".portpy_ready.json"
 
 
 def ensure_patient(patient_id: str, portpy_repo: Path) -> Path:
@@ -24,44 +36,55 @@ def ensure_patient(patient_id: str, portpy_repo: Path) -> Path:
         "StructureSet_MetaData.json",
     ]
 
-    # If present and has required files, return; otherwise purge and re-download
-    if target_dir.exists():
-        missing = [name for name in required if not (target_dir / name).exists()]
-        try:
-            next(target_dir.iterdir())
-            is_empty = False
-        except StopIteration:
-            is_empty = True
+    # A completed download leaves a sentinel, so the warm path is a single stat.
+    ready_path = target_dir / READY_FILE
+    if ready_path.exists():
+        return target_dir
 
-        if not is_empty and not missing:
+    # If present and has required files, return; otherwise purge and re-download.
+    # One directory listing replaces the per-file exists()/iterdir() stats.
+    entries = _list_names(target_dir)
+    if entries is not None:
+        if all(name in entries for name in required):
+            _write_ready(ready_path, required)
             return target_dir
-
-        import shutil
-
         shutil.rmtree(target_dir)
 
-    cache_dir = portpy_repo / "hf_cache"
-    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Download straight into portpy_repo/data/<patient_id> (the repo's own layout), so no
+    # snapshot-to-target copy is needed; huggingface_hub resumes partial files in place.
     patterns = [f"data/{patient_id}/**"]
-    snapshot_path = snapshot_download(
+    snapshot_download(
         repo_id=DATASET_REPO,
         repo_type="dataset",
-        cache_dir=cache_dir,
+        local_dir=str(portpy_repo),
         allow_patterns=patterns,
-        resume_download=True,
+        max_workers=DOWNLOAD_WORKERS,
     )
-    src = Path(snapshot_path) / "data" / patient_id
-    if not src.exists() or not any(src.iterdir()):
-        raise FileNotFoundError(f"Patient {patient_id} not found in snapshot {snapshot_path}")
-    data_dir.mkdir(parents=True, exist_ok=True)
-    if target_dir.exists():
-        import shutil
-        shutil.rmtree(target_dir)
-    import shutil
-    shutil.copytree(src, target_dir)
+    entries = _list_names(target_dir)
+    if not entries:
+        raise FileNotFoundError(f"Patient {patient_id} not found in {DATASET_REPO}")
+    if all(name in entries for name in required):
+        _write_ready(ready_path, required)
     return target_dir
 
 
+def _list_names(path: Path) -> Optional[Set[str]]:
+    """Names in a directory from a single scandir pass; None if the directory is missing."""
+    try:
+        with os.scandir(path) as it:
+            return {entry.name for entry in it}
+    except FileNotFoundError:
+        return None
+
+
+def _write_ready(path: Path, required: List[str]) -> None:
+    """Record that the patient folder is complete; best effort, a missing sentinel only costs a rescan."""
+    try:
+        path.write_text(json.dumps({"files": required, "version": 1}))
+    except OSError:
+        pass
+
+
 if __name__ == "__main__":
     import argparse
 
@@ -1,19 +1,28 @@
 """FastAPI backend for PortPy VMAT demo."""
 from __future__ import annotations
 
+import asyncio
 import base64
+import codecs
 import io
 import time
 import h5py
 import numpy as np
 import json
 import os
+import re
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
+from urllib.parse import quote, urlencode
 
-from fastapi import BackgroundTasks, FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from contextlib import contextmanager
 try:
     from dotenv import load_dotenv  # type: ignore
@@ -23,27 +32,48 @@ try:
     import pydicom  # type: ignore
 except Exception:
     pydicom = None
-from scipy.ndimage import binary_erosion
+try:
+    import numexpr  # type: ignore
+except Exception:
+    numexpr = None
+try:
+    import imagecodecs  # type: ignore
+except Exception:
+    imagecodecs = None
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None
 
 from .download_patient import ensure_patient as ensure_patient_local
 from .portpy_runner.vmat_global_optimal_runner import default_config, run_vmat_global_optimal
 from .objective_schema import default_schema
 from .storage import (
     ensure_dirs,
+    canonical_config,
     generate_run_id,
     load_run,
+    load_run_status,
+    load_dose_array,
+    save_dose_3d,
     save_run_artifacts,
     append_log_line,
+    flush_logs,
     load_log_lines,
     append_progress,
+    flush_progress,
     load_progress,
+    read_json,
     RUNS_DIR,
-    _read_json,
     run_dir,
 )
 from .objective_schema import _to_native
 
-app = FastAPI(title="PortPy VMAT Demo", version="0.1.0")
+app = FastAPI(
+    title="PortPy VMAT Demo",
+    version="0.1.0",
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse,
+)
 
 # Load .env if present (for HF_TOKEN, etc.)
 if load_dotenv:
@@ -66,24 +96,160 @@ def _portpy_repo() -> Path:
     return _repo_root() / "PortPy-master"
 
 
+# The UI polls case listings/manifests heavily; keep short-lived results in-process.
+_CASE_CACHE_TTL_S = 5.0
+_CASES_CACHE: Optional[Tuple[float, List[str]]] = None
+_MISSING_CASES: Dict[str, float] = {}
+
+
+# Open HDF5 handles reused across slice requests (frontend scrubbing hits the same files).
+# Handles are shared across request threads, so entries are only ever dropped, never
+# close()d: closing a File invalidates its datasets mid-read in other threads, while a
+# dropped File closes itself once the last File/Dataset reference is garbage-collected.
+_H5_CACHE_SIZE = 8
+_H5_CACHE: "OrderedDict[str, Tuple[int, h5py.File, Dict[str, h5py.Dataset]]]" = OrderedDict()
+_H5_LOCK = threading.Lock()
+
+
+def _open_h5_entry(path: Path, **file_kwargs: Any) -> Tuple[h5py.File, Dict[str, h5py.Dataset]]:
+    """
+    Cached read-only handle for path plus its memoised datasets; reopened when the mtime changes.
+    file_kwargs (e.g. chunk-cache settings) only apply when the file is (re)opened.
+    """
+    key = str(path)
+    mtime_ns = path.stat().st_mtime_ns
+    with _H5_LOCK:
+        cached = _H5_CACHE.get(key)
+        if cached is not None and cached[0] == mtime_ns:
+            _H5_CACHE.move_to_end(key)
+            return cached[1], cached[2]
+        h5 = h5py.File(path, "r", **file_kwargs)
+        datasets: Dict[str, h5py.Dataset] = {}
+        _H5_CACHE[key] = (mtime_ns, h5, datasets)
+        _H5_CACHE.move_to_end(key)
+        while len(_H5_CACHE) > _H5_CACHE_SIZE:
+            _H5_CACHE.popitem(last=False)
+        return h5, datasets
+
+
+def _open_h5(path: Path, **file_kwargs: Any) -> h5py.File:
+    """Return a cached read-only handle for path, reopened when the file's mtime changes."""
+    return _open_h5_entry(path, **file_kwargs)[0]
+
+
+def _h5_dataset(path: Path, name: str, **file_kwargs: Any) -> Optional[h5py.Dataset]:
+    """Dataset from the cached handle, kept across calls so repeat reads skip the group lookup."""
+    h5, datasets = _open_h5_entry(path, **file_kwargs)
+    ds = datasets.get(name)
+    if ds is None:
+        if name not in h5:
+            return None
+        ds = datasets.setdefault(name, h5[name])
+    return ds
+
+
+# StructureSet masks are read structure after structure (overlays, DVH, criteria); a larger
+# per-dataset chunk cache than h5py's 1 MiB default avoids re-decompressing shared chunks.
+_SS_CHUNK_CACHE = {"rdcc_nbytes": 64 << 20, "rdcc_nslots": 100003, "rdcc_w0": 0.75}
+
+
+def _open_ss(ss_data_path: Path) -> h5py.File:
+    """Cached StructureSet_Data.h5 handle opened with the tuned chunk cache."""
+    return _open_h5(ss_data_path, **_SS_CHUNK_CACHE)
+
+
+def _drop_h5_handles(directory: Path) -> None:
+    """Forget cached handles under directory (e.g. before a patient folder is replaced)."""
+    prefix = str(directory) + os.sep
+    with _H5_LOCK:
+        for key in [k for k in _H5_CACHE if k.startswith(prefix)]:
+            del _H5_CACHE[key]
+
+
+def _drop_h5_handle(path: Path) -> None:
+    """Forget the cached handle for path (e.g. before the file is replaced)."""
+    with _H5_LOCK:
+        _H5_CACHE.pop(str(path), None)
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    """Single stat that doubles as an existence check; None when the path is missing."""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _invalidate_case_caches() -> None:
+    global _CASES_CACHE
+    _CASES_CACHE = None
+    _MISSING_CASES.clear()
+    _clinical_criteria.cache_clear()
+    _prescription.cache_clear()
+
+
+# Rendered/computed responses (slice PNGs, dose overlays, reference-dose DVHs), keyed by
+# (route, case_id, params..., backing-file mtimes) so a replaced file never serves stale data.
+_RESPONSE_CACHE_SIZE = 128
+_RESPONSE_CACHE: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+_RESPONSE_LOCK = threading.Lock()
+
+
+def _response_cache_get(key: Tuple[Any, ...]) -> Any:
+    with _RESPONSE_LOCK:
+        value = _RESPONSE_CACHE.get(key)
+        if value is not None:
+            _RESPONSE_CACHE.move_to_end(key)
+        return value
+
+
+def _response_cache_put(key: Tuple[Any, ...], value: Any) -> None:
+    with _RESPONSE_LOCK:
+        _RESPONSE_CACHE[key] = value
+        while len(_RESPONSE_CACHE) > _RESPONSE_CACHE_SIZE:
+            _RESPONSE_CACHE.popitem(last=False)
+
+
+def _clear_response_cache(case_id: str) -> None:
+    with _RESPONSE_LOCK:
+        for key in [k for k in _RESPONSE_CACHE if k[1] == case_id]:
+            del _RESPONSE_CACHE[key]
+
+
 @app.get("/cases")
-def list_cases() -> Dict[str, Any]:
+async def list_cases() -> Dict[str, Any]:
+    if _CASES_CACHE is not None and time.monotonic() - _CASES_CACHE[0] < _CASE_CACHE_TTL_S:
+        return {"cases": list(_CASES_CACHE[1])}
+    # Directory scans can stall on network storage; keep them off the event loop.
+    return {"cases": list(await asyncio.to_thread(_scan_cases))}
+
+
+def _scan_cases() -> List[str]:
+    global _CASES_CACHE
     meta_dir = _portpy_repo() / "metadata"
     data_dir = _portpy_repo() / "data"
-    cases = []
-    if meta_dir.exists():
-        cases += [d.name for d in meta_dir.iterdir() if d.is_dir() and "Patient" in d.name]
-    if data_dir.exists():
-        cases += [d.name for d in data_dir.iterdir() if d.is_dir() and "Patient" in d.name]
-    cases = sorted(list(set(cases)), key=lambda x: [int(t) if t.isdigit() else t for t in _split_case_key(x)])
+    unique = {name for path in (meta_dir, data_dir) for name in _scan_case_dirs(path)}
+    cases = sorted(unique, key=_case_sort_key)
     print(f"[list_cases] found {len(cases)} cases from meta/data dirs")
-    return {"cases": cases}
+    _CASES_CACHE = (time.monotonic(), cases)
+    return cases
 
 
-def _split_case_key(name: str):
-    import re
+def _scan_case_dirs(path: Path) -> List[str]:
+    """Patient folder names under path; scandir's cached d_type avoids a stat per entry."""
+    try:
+        with os.scandir(path) as it:
+            return [entry.name for entry in it if "Patient" in entry.name and entry.is_dir()]
+    except FileNotFoundError:
+        return []
 
-    return re.findall(r"\d+|\D+", name)
+
+_CASE_KEY_RE = re.compile(r"\d+|\D+")
+
+
+def _case_sort_key(name: str) -> Tuple[Any, ...]:
+    """Natural sort key: "Lung_Patient_10" orders after "Lung_Patient_9"."""
+    return tuple(int(t) if t.isdigit() else t for t in _CASE_KEY_RE.findall(name))
 
 
 @app.get("/cases/{case_id}")
@@ -94,34 +260,92 @@ def get_case(case_id: str) -> Dict[str, Any]:
     return manifest
 
 
-@app.get("/cases/{case_id}/dose_slice/{slice_idx}")
-def get_dose_slice(case_id: str, slice_idx: int, threshold_gy: Optional[float] = None) -> Dict[str, Any]:
+_DOSE_PNG_CACHE_CONTROL = "public, max-age=3600"
+
+
+def _json_response(payload: Any) -> Response:
+    """JSON response for payloads that may hold NumPy arrays/scalars (bypasses jsonable_encoder)."""
+    if orjson is not None:
+        return ORJSONResponse(payload)
+    return JSONResponse(_to_native(payload))
+
+
+def _dose_overlay_url(prefix: str, slice_idx: int, threshold_gy: Optional[float], version: Optional[int]) -> str:
     """
-    Return a dose overlay PNG for the given slice, derived from the reference RT Dose resampled to CT.
+    Overlay PNG URL. `version` (the source dose file's mtime) is part of the URL so the
+    max-age cached image changes whenever the dose on disk does.
     """
+    params = {}
+    if threshold_gy is not None:
+        params["threshold_gy"] = threshold_gy
+    if version is not None:
+        params["v"] = version
+    url = f"{prefix}/dose_slice/{slice_idx}.png"
+    if params:
+        url += f"?{urlencode(params)}"
+    return url
+
+
+def _case_dose_slice(case_id: str, slice_idx: int) -> Tuple[np.ndarray, Path]:
+    """Reference dose slice on the CT grid plus its RT Dose path, or raise HTTPException."""
     case_dir = _portpy_repo() / "data" / case_id
     if not case_dir.exists():
         raise HTTPException(status_code=404, detail=f"Case directory not found: {case_dir}")
 
     rt_dose_path = _find_rt_dose(case_dir)
     try:
-        dose_3d = _load_dose_resampled_to_ct(case_id=case_id, rt_dose_path=rt_dose_path)
+        dose_slice, num_slices = _load_dose_slice(case_id, rt_dose_path, slice_idx)
     except HTTPException:
         raise
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=500, detail=f"Failed to load RT Dose: {exc}")
 
-    if slice_idx < 0 or slice_idx >= dose_3d.shape[0]:
-        raise HTTPException(status_code=400, detail=f"slice_idx out of range (0-{dose_3d.shape[0]-1})")
+    if dose_slice is None:
+        raise HTTPException(status_code=400, detail=f"slice_idx out of range (0-{num_slices-1})")
+    return dose_slice, rt_dose_path
+
 
-    dose_slice = dose_3d[slice_idx, :, :]
-    overlay_png = _dose_overlay_png(dose_slice, threshold_gy=threshold_gy)
-    stats = {
+def _dose_slice_stats(dose_slice: np.ndarray) -> Dict[str, Any]:
+    return {
         "mean_gy": float(np.mean(dose_slice)),
         "max_gy": float(np.max(dose_slice)),
         "shape": list(dose_slice.shape),
     }
-    return {"slice_index": slice_idx, "overlay_png": overlay_png, "stats": stats}
+
+
+@app.get("/cases/{case_id}/dose_slice/{slice_idx}.png")
+def get_dose_slice_png(case_id: str, slice_idx: int, threshold_gy: Optional[float] = None) -> Response:
+    """
+    Return the reference-dose heatmap overlay for a slice as raw PNG bytes.
+    Registered before the JSON route so "<idx>.png" is not captured as a slice index.
+    """
+    case_dir = _portpy_repo() / "data" / case_id
+    if not case_dir.exists():
+        raise HTTPException(status_code=404, detail=f"Case directory not found: {case_dir}")
+    rt_dose_path = _find_rt_dose(case_dir)
+    cache_key = ("dose_png", case_id, slice_idx, threshold_gy, str(rt_dose_path), _mtime_ns(rt_dose_path))
+    png = _response_cache_get(cache_key)
+    if png is None:
+        dose_slice, _ = _case_dose_slice(case_id, slice_idx)
+        png = _dose_overlay_png(dose_slice, threshold_gy=threshold_gy)
+        _response_cache_put(cache_key, png)
+    return Response(content=png, media_type="image/png", headers={"Cache-Control": _DOSE_PNG_CACHE_CONTROL})
+
+
+@app.get("/cases/{case_id}/dose_slice/{slice_idx}")
+def get_dose_slice(case_id: str, slice_idx: int, threshold_gy: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Return stats and the overlay PNG URL for the given slice, derived from the reference RT Dose
+    resampled to CT. The image itself is served by the sibling .png route.
+    """
+    dose_slice, rt_dose_path = _case_dose_slice(case_id, slice_idx)
+    return {
+        "slice_index": slice_idx,
+        "overlay_url": _dose_overlay_url(
+            f"/cases/{quote(case_id)}", slice_idx, threshold_gy, _mtime_ns(rt_dose_path)
+        ),
+        "stats": _dose_slice_stats(dose_slice),
+    }
 
 
 @app.get("/cases/{case_id}/reference_dose")
@@ -138,32 +362,60 @@ def get_reference_dose(case_id: str, structs: Optional[str] = None) -> Dict[str,
     rt_plan_path = _find_rt_plan(case_dir)
     ss_meta_path = case_dir / "StructureSet_MetaData.json"
     ss_data_path = case_dir / "StructureSet_Data.h5"
-    if not ss_meta_path.exists() or not ss_data_path.exists():
+    ss_meta_mtime = _mtime_ns(ss_meta_path)
+    ss_data_mtime = _mtime_ns(ss_data_path)
+    if ss_meta_mtime is None or ss_data_mtime is None:
         raise HTTPException(status_code=404, detail="StructureSet files not found")
+    cache_key = (
+        "reference_dose",
+        case_id,
+        structs,
+        str(rt_dose_path),
+        _mtime_ns(rt_dose_path),
+        ss_meta_mtime,
+        ss_data_mtime,
+    )
+    cached = _response_cache_get(cache_key)
+    if cached is not None:
+        return _json_response(cached)
 
     struct_filter = structs.split(",") if structs else None
     try:
         dose_3d = _load_dose_resampled_to_ct(case_id=case_id, rt_dose_path=rt_dose_path)
+        ss_structs = _load_ss_meta(str(ss_meta_path), ss_meta_mtime)
         # Prescription info from clinical criteria for context
         try:
-            import portpy.photon as pp  # type: ignore
-
-            data = pp.DataExplorer(data_dir=str(_portpy_repo() / "data"))
-            data.patient_id = case_id
-            clinical_criteria = pp.ClinicalCriteria(data, protocol_name=default_config().get("protocol_global_opt", ""))
-            pres_gy = clinical_criteria.get_prescription()
-            num_fx = clinical_criteria.get_num_of_fractions()
-            clinical_table = _clinical_criteria_from_dose(
-                dose_3d=dose_3d,
-                ss_meta_path=ss_meta_path,
-                ss_data_path=ss_data_path,
-                clinical_criteria=clinical_criteria,
-                prescription_gy=pres_gy,
-            )
+            protocol = default_config().get("protocol_global_opt", "")
+            clinical_criteria = _clinical_criteria(case_id, protocol)
+            pres_gy, num_fx = _prescription(case_id, protocol)
         except Exception:
+            clinical_criteria = None
             pres_gy = None
             num_fx = None
-            clinical_table = []
+        # One quantisation of the dose and one gather/bincount per structure, shared below.
+        analysis_names = set(_dvh_structure_names(ss_structs, struct_filter))
+        if clinical_criteria is not None:
+            analysis_names |= _criteria_structure_names(clinical_criteria)
+        # Read only the masks the DVH and clinical criteria use, once each.
+        masks = _load_structure_masks(
+            ss_data_path, [(n, ds) for n, ds in ss_structs if n in analysis_names], dose_3d.shape
+        )
+        analysis = _analyze_dose(dose_3d, masks, analysis_names)
+        clinical_table = []
+        if clinical_criteria is not None:
+            try:
+                clinical_table = _clinical_criteria_from_dose(
+                    dose_3d=dose_3d,
+                    ss_meta_path=ss_meta_path,
+                    ss_data_path=ss_data_path,
+                    clinical_criteria=clinical_criteria,
+                    prescription_gy=pres_gy,
+                    analysis=analysis,
+                )
+            except Exception:
+                pres_gy = None
+                num_fx = None
+                clinical_table = []
     except HTTPException:
         raise
     except Exception as exc:  # noqa: BLE001
@@ -174,13 +426,14 @@ def get_reference_dose(case_id: str, structs: Optional[str] = None) -> Dict[str,
         ss_meta_path=ss_meta_path,
         ss_data_path=ss_data_path,
         struct_filter=struct_filter,
+        analysis=analysis,
     )
     dose_stats = {
         "mean_gy": float(np.mean(dose_3d)),
         "max_gy": float(np.max(dose_3d)),
         "shape": list(dose_3d.shape),
     }
-    return _to_native({
+    payload = {
         "case_id": case_id,
         "plan": {
             "rt_plan_path": str(rt_plan_path) if rt_plan_path else None,
@@ -199,86 +452,372 @@ def get_reference_dose(case_id: str, structs: Optional[str] = None) -> Dict[str,
         "dvh": dvh,
         "metrics": metrics,
         "clinical_criteria": clinical_table,
-    })
+    }
+    _response_cache_put(cache_key, payload)
+    return _json_response(payload)
+
+
+_CT_WINDOW_CENTER = 0
+_CT_WINDOW_WIDTH = 400
+
+
+_SLICE_CACHE_CONTROL = "public, max-age=86400"
+
+
+@app.get("/cases/{case_id}/ct_slice/{slice_idx}.png")
+async def get_ct_slice_png(
+    case_id: str, slice_idx: int, request: Request, structs: Optional[str] = None
+) -> Response:
+    """
+    Return a CT axial slice as raw PNG bytes (with contour outlines when structures are available).
+    Registered before the JSON route so "<idx>.png" is not captured as a slice index.
+    The H5 read and render/encode run in worker threads so the event loop keeps serving.
+    """
+    etag = _ct_slice_etag(case_id, slice_idx)
+    if etag and _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": _SLICE_CACHE_CONTROL})
+    cache_key = ("ct_png", case_id, slice_idx, structs, etag)
+    cached = _response_cache_get(cache_key) if etag else None
+    if cached is not None:
+        png, num_slices = cached
+    else:
+        slice_hu, num_slices = await asyncio.to_thread(_read_ct_slice, case_id, slice_idx)
+        try:
+            png = await asyncio.to_thread(
+                _render_ct_png, case_id, slice_idx, slice_hu, structs.split(",") if structs else None
+            )
+        except Exception as exc:  # noqa: BLE001
+            raise HTTPException(status_code=500, detail=f"Failed to render CT slice: {exc}")
+        if etag:
+            _response_cache_put(cache_key, (png, num_slices))
+    headers = {"X-Num-Slices": str(num_slices), "Cache-Control": _SLICE_CACHE_CONTROL}
+    if etag:
+        headers["ETag"] = etag
+    return Response(content=png, media_type="image/png", headers=headers)
 
 
 @app.get("/cases/{case_id}/ct_slice/{slice_idx}")
-def get_ct_slice(case_id: str, slice_idx: int, structs: Optional[str] = None) -> Dict[str, Any]:
+async def get_ct_slice(
+    case_id: str, slice_idx: int, request: Request, response: Response, structs: Optional[str] = None
+) -> Any:
     """
-    Return a CT axial slice as base64 PNG plus basic metadata/debug info.
-    If structures are available, overlays contour outlines.
+    Return CT slice stats plus the URL of the rendered PNG and basic debug info.
+    The image itself is served by the sibling .png route so it is not base64-inflated.
     """
+    etag = _ct_slice_etag(case_id, slice_idx)
+    if etag and _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": _SLICE_CACHE_CONTROL})
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = _SLICE_CACHE_CONTROL
+    slice_hu, num_slices, debug = await asyncio.to_thread(_read_ct_slice_with_debug, case_id, slice_idx)
+    image_url = f"/cases/{quote(case_id)}/ct_slice/{slice_idx}.png"
+    if structs:
+        image_url += f"?structs={quote(structs)}"
+    return {
+        "slice_index": slice_idx,
+        "num_slices": int(num_slices),
+        "stats": {
+            "mean_hu": float(np.mean(slice_hu, dtype=np.float32)),
+            "min_hu": float(np.min(slice_hu)),
+            "max_hu": float(np.max(slice_hu)),
+        },
+        "window": {"center": _CT_WINDOW_CENTER, "width": _CT_WINDOW_WIDTH},
+        "image_url": image_url,
+        "debug": debug,
+    }
+
+
+def _read_ct_slice_with_debug(case_id: str, slice_idx: int) -> Tuple[np.ndarray, int, Dict[str, Any]]:
     case_dir = _portpy_repo() / "data" / case_id
-    ct_meta_path = case_dir / "CT_MetaData.json"
     ct_data_path = case_dir / "CT_Data.h5"
-    ss_meta_path = case_dir / "StructureSet_MetaData.json"
-    ss_data_path = case_dir / "StructureSet_Data.h5"
     debug = {
         "ct_path": str(ct_data_path),
         "ct_exists": ct_data_path.exists(),
         "folder_listing": [p.name for p in case_dir.iterdir()] if case_dir.exists() else [],
     }
-    if not ct_meta_path.exists() or not ct_data_path.exists():
+    slice_hu, num_slices = _read_ct_slice(case_id, slice_idx, debug=debug)
+    return slice_hu, num_slices, debug
+
+
+def _ct_slice_etag(case_id: str, slice_idx: int) -> Optional[str]:
+    """Weak validator for a rendered slice: changes whenever the CT or structure data is replaced."""
+    case_dir = _portpy_repo() / "data" / case_id
+    ct_mtime = _mtime_ns(case_dir / "CT_Data.h5")
+    if ct_mtime is None:
+        return None
+    ss_mtime = _mtime_ns(case_dir / "StructureSet_Data.h5") or 0
+    return f'W/"{case_id}-{slice_idx}-{ct_mtime}-{ss_mtime}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (tag.strip() for tag in header.split(","))
+
+
+def _read_ct_slice(
+    case_id: str, slice_idx: int, debug: Optional[Dict[str, Any]] = None
+) -> Tuple[np.ndarray, int]:
+    """Read one HU slice for a case; returns (slice, number of slices) or raises HTTPException."""
+    case_dir = _portpy_repo() / "data" / case_id
+    ct_meta_path = case_dir / "CT_MetaData.json"
+    ct_data_path = case_dir / "CT_Data.h5"
+    ct_meta_mtime = _mtime_ns(ct_meta_path)
+    if ct_meta_mtime is None or _mtime_ns(ct_data_path) is None:
         raise HTTPException(status_code=404, detail="CT files not found")
-    with ct_meta_path.open() as f:
-        meta = json.load(f)
-    dataset_key = meta.get("ct_hu_3d_File", "CT_Data.h5/ct_hu_3d").split("/")[-1]
+    dataset_key = _ct_dataset_key(str(ct_meta_path), ct_meta_mtime)
     try:
-        with h5py.File(ct_data_path, "r") as h5:
-            if dataset_key not in h5:
-                debug["ct_keys"] = list(h5.keys())
-                raise HTTPException(status_code=404, detail="CT dataset not found in H5")
-            arr = h5[dataset_key]
-            num_slices = arr.shape[0]
-            if slice_idx < 0 or slice_idx >= num_slices:
-                raise HTTPException(status_code=400, detail=f"slice_idx out of range (0-{num_slices-1})")
-            slice_hu = arr[slice_idx, :, :]
+        arr = _h5_dataset(ct_data_path, dataset_key)
+        if arr is None:
+            if debug is not None:
+                debug["ct_keys"] = list(_open_h5(ct_data_path).keys())
+            raise HTTPException(status_code=404, detail="CT dataset not found in H5")
+        num_slices = arr.shape[0]
+        if slice_idx < 0 or slice_idx >= num_slices:
+            raise HTTPException(status_code=400, detail=f"slice_idx out of range (0-{num_slices-1})")
+        return _read_slice(arr, slice_idx), int(num_slices)
     except HTTPException:
         raise
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=500, detail=str(exc))
 
-    window_center = 0
-    window_width = 400
-    lo = window_center - window_width / 2
-    hi = window_center + window_width / 2
-    img = np.clip(slice_hu, lo, hi)
-    img = (img - lo) / (hi - lo) * 255.0
-    img_uint8 = img.astype(np.uint8)
+
+def _render_ct_png(
+    case_id: str, slice_idx: int, slice_hu: np.ndarray, struct_filter: Optional[List[str]] = None
+) -> bytes:
+    """Window a HU slice, overlay contour outlines when structures are available, and encode PNG."""
+    from PIL import Image
+
+    case_dir = _portpy_repo() / "data" / case_id
+    ss_meta_path = case_dir / "StructureSet_MetaData.json"
+    ss_data_path = case_dir / "StructureSet_Data.h5"
+    img_uint8 = _window_to_uint8(slice_hu, _CT_WINDOW_CENTER, _CT_WINDOW_WIDTH)
     # Convert to RGBA for overlays
-    try:
-        from PIL import Image
+    pil_img = Image.fromarray(img_uint8).convert("RGBA")
+    if ss_meta_path.exists() and ss_data_path.exists():
+        _overlay_contours(
+            pil_img,
+            ss_meta_path=ss_meta_path,
+            ss_data_path=ss_data_path,
+            slice_idx=slice_idx,
+            struct_filter=struct_filter,
+        )
+    return _encode_png(pil_img)
 
-        pil_img = Image.fromarray(img_uint8).convert("RGBA")
-        overlays_applied = False
-        if ss_meta_path.exists() and ss_data_path.exists():
-            overlays_applied = _overlay_contours(
-                pil_img,
-                ss_meta_path=ss_meta_path,
-                ss_data_path=ss_data_path,
-                slice_idx=slice_idx,
-                struct_filter=structs.split(",") if structs else None,
-            )
-        buf = io.BytesIO()
-        pil_img.save(buf, format="PNG")
-        image_b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-        image_png = f"data:image/png;base64,{image_b64}"
+
+# zlib level 1: slices are re-rendered on every scroll, so encode speed beats a few extra KB.
+_PNG_COMPRESS_LEVEL = 1
+
+
+def _encode_png(pil_img) -> bytes:
+    """Encode a PIL image as PNG, preferring imagecodecs' libpng encoder when installed."""
+    if imagecodecs is not None:
+        try:
+            return bytes(imagecodecs.png_encode(np.asarray(pil_img), level=_PNG_COMPRESS_LEVEL))
+        except Exception:
+            pass
+    buf = io.BytesIO()
+    pil_img.save(buf, format="PNG", compress_level=_PNG_COMPRESS_LEVEL, optimize=False)
+    return buf.getvalue()
+
+
+def _read_slice(ds, slice_idx: int) -> np.ndarray:
+    """Read one axial slice of a 3-D h5py dataset straight into a preallocated array."""
+    out = np.empty(ds.shape[1:], dtype=ds.dtype)
+    ds.read_direct(out, source_sel=np.s_[slice_idx, :, :], dest_sel=np.s_[:, :])
+    return out
+
+
+def _read_mask(ds) -> np.ndarray:
+    """
+    Read a whole structure mask as bool. Byte-sized masks (PortPy stores 0/1 uint8) are read
+    directly into a preallocated buffer and reinterpreted in place, skipping the uint8->bool copy.
+    """
+    if ds.dtype.itemsize != 1:
+        return ds[()].astype(bool)
+    out = np.empty(ds.shape, dtype=ds.dtype)
+    ds.read_direct(out)
+    return out.view(bool)
+
+
+def _window_to_uint8(slice_hu: np.ndarray, center: float, width: float) -> np.ndarray:
+    """
+    Apply a HU window and scale to 0-255 with a single temporary instead of one per step.
+    Works in float32 (twice the SIMD lanes of float64); output matches the float64 path for
+    integer HU input.
+    """
+    lo = np.float32(center - width / 2)
+    hi = np.float32(center + width / 2)
+    scale = np.float32(255.0 / width)
+    if numexpr is not None:
+        img = numexpr.evaluate(
+            "(where(s < lo, lo, where(s > hi, hi, s)) - lo) * scale",
+            local_dict={"s": slice_hu.astype(np.float32, copy=False), "lo": lo, "hi": hi, "scale": scale},
+        )
+    else:
+        # Clip straight from the stored (usually int16) slice into float32: the widening
+        # happens inside the clip loop rather than as a separate astype pass.
+        img = np.clip(slice_hu, lo, hi, dtype=np.float32)
+        img -= lo
+        img *= scale
+    return img.astype(np.uint8)
+
+
+def _mask_boundary(mask: np.ndarray) -> np.ndarray:
+    """
+    Outline of a mask over its last two axes: mask & ~erode(mask) with a 4-neighbour cross.
+    Uses four shifted ANDs instead of scipy's generic N-D erosion; pixels on the image edge
+    count as boundary, matching binary_erosion's default border_value=0.
+    """
+    m = mask.astype(bool, copy=False)
+    eroded = m.copy()
+    eroded[..., 1:, :] &= m[..., :-1, :]
+    eroded[..., :-1, :] &= m[..., 1:, :]
+    eroded[..., :, 1:] &= m[..., :, :-1]
+    eroded[..., :, :-1] &= m[..., :, 1:]
+    eroded[..., 0, :] = False
+    eroded[..., -1, :] = False
+    eroded[..., :, 0] = False
+    eroded[..., :, -1] = False
+    return m & ~eroded
+
+
+def _packed_boundary(packed: np.ndarray) -> np.ndarray:
+    """
+    _mask_boundary on np.packbits(mask, axis=-1) data, eight pixels per byte (SWAR).
+    Horizontal neighbours are byte shifts with the carry bit taken from the adjacent byte;
+    out-of-range neighbours (image edges, pad bits) read as 0, like border_value=0.
+    """
+    eroded = packed.copy()
+    eroded[..., 1:, :] &= packed[..., :-1, :]
+    eroded[..., :-1, :] &= packed[..., 1:, :]
+    eroded[..., 0, :] = 0
+    eroded[..., -1, :] = 0
+    # Big-endian bit order: pixel j-1 is the next higher bit, or bit 0 of the previous byte.
+    left = packed >> 1
+    left[..., 1:] |= packed[..., :-1] << 7
+    right = packed << 1
+    right[..., :-1] |= packed[..., 1:] >> 7
+    eroded &= left
+    eroded &= right
+    return packed & ~eroded
+
+
+_BOUNDARIES_FILE = "Boundaries_Data.h5"
+_BOUNDARIES_SLAB = 32
+# Builds run off the request path; the lock only guards the bookkeeping below.
+_BOUNDARIES_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="boundaries")
+_BOUNDARIES_LOCK = threading.Lock()
+# case dir -> StructureSet mtime of the build queued/running, or of the last failed build
+# (not retried until the structure set changes).
+_BOUNDARIES_PENDING: Dict[str, int] = {}
+_BOUNDARIES_FAILED: Dict[str, int] = {}
+
+
+def _ensure_boundaries(case_dir: Path) -> Optional[Path]:
+    """
+    Return the path of case_dir/Boundaries_Data.h5 if it is current for the structure set.
+
+    Otherwise queue a background build (one per case and structure-set version) and return
+    None; callers compute outlines on the fly until the file is ready.
+    """
+    ss_data_path = case_dir / "StructureSet_Data.h5"
+    out_path = case_dir / _BOUNDARIES_FILE
+    src_mtime = _mtime_ns(ss_data_path)
+    if src_mtime is None:
+        return None
+    if _mtime_ns(out_path) is not None:
+        try:
+            if _open_h5(out_path).attrs.get("source_mtime_ns") == src_mtime:
+                return out_path
+        except Exception as exc:  # noqa: BLE001
+            print(f"[boundaries] cannot read {out_path}, rebuilding: {exc!r}")
+    key = str(case_dir)
+    with _BOUNDARIES_LOCK:
+        if src_mtime in (_BOUNDARIES_PENDING.get(key), _BOUNDARIES_FAILED.get(key)):
+            return None
+        _BOUNDARIES_PENDING[key] = src_mtime
+    _BOUNDARIES_POOL.submit(_build_boundaries, case_dir, src_mtime)
+    return None
+
+
+def _build_boundaries(case_dir: Path, src_mtime: int) -> None:
+    """
+    Write case_dir/Boundaries_Data.h5: each structure mask from StructureSet_Data.h5 stored
+    as its outline, bit-packed along the last axis, tagged with the source mtime.
+    """
+    key = str(case_dir)
+    out_path = case_dir / _BOUNDARIES_FILE
+    tmp_path = out_path.with_name(f".{_BOUNDARIES_FILE}.{os.getpid()}.tmp")
+    try:
+        src = _open_ss(case_dir / "StructureSet_Data.h5")
+        with h5py.File(tmp_path, "w") as dst:
+            for name, ds in src.items():
+                if not isinstance(ds, h5py.Dataset) or ds.ndim != 3:
+                    continue
+                depth, height, width = ds.shape
+                out = dst.create_dataset(
+                    name,
+                    shape=(depth, height, (width + 7) // 8),
+                    dtype=np.uint8,
+                    chunks=(1, height, (width + 7) // 8),
+                    compression="lzf",
+                )
+                out.attrs["width"] = width
+                for z0 in range(0, depth, _BOUNDARIES_SLAB):
+                    z1 = min(z0 + _BOUNDARIES_SLAB, depth)
+                    out[z0:z1] = _packed_boundary(np.packbits(ds[z0:z1].astype(bool, copy=False), axis=-1))
+            dst.attrs["source_mtime_ns"] = src_mtime
+        _drop_h5_handle(out_path)
+        os.replace(tmp_path, out_path)
     except Exception as exc:  # noqa: BLE001
-        image_png = None
-        debug["overlay_error"] = str(exc)
+        print(f"[boundaries] build failed for {case_dir}: {exc!r}")
+        traceback.print_exc()
+        tmp_path.unlink(missing_ok=True)
+        with _BOUNDARIES_LOCK:
+            _BOUNDARIES_FAILED[key] = src_mtime
+    finally:
+        with _BOUNDARIES_LOCK:
+            if _BOUNDARIES_PENDING.get(key) == src_mtime:
+                del _BOUNDARIES_PENDING[key]
 
-    return {
-        "slice_index": slice_idx,
-        "num_slices": int(arr.shape[0]),
-        "stats": {
-            "mean_hu": float(np.mean(slice_hu)),
-            "min_hu": float(np.min(slice_hu)),
-            "max_hu": float(np.max(slice_hu)),
-        },
-        "window": {"center": window_center, "width": window_width},
-        "image_png": image_png,
-        "debug": debug,
-    }
+
+@lru_cache(maxsize=64)
+def _load_ss_meta(ss_meta_path: str, mtime_ns: int) -> Tuple[Tuple[str, str], ...]:
+    """(structure name, mask dataset name) pairs from StructureSet_MetaData.json (cached per file version)."""
+    ss_meta = read_json(Path(ss_meta_path))
+    if isinstance(ss_meta, dict) and "structures" in ss_meta:
+        names = ss_meta["structures"].get("name", [])
+        mask_files = ss_meta["structures"].get("structure_mask_3d_File", [])
+    else:
+        names = [s.get("name") for s in ss_meta]
+        mask_files = [s.get("structure_mask_3d_File") for s in ss_meta]
+    return tuple((name, mask_file.split("/")[-1]) for name, mask_file in zip(names, mask_files) if name and mask_file)
+
+
+@lru_cache(maxsize=256)
+def _ct_dataset_key(ct_meta_path: str, mtime_ns: int) -> str:
+    """Resolve the CT HU dataset name from CT_MetaData.json (cached per file version)."""
+    meta = read_json(Path(ct_meta_path))
+    return meta.get("ct_hu_3d_File", "CT_Data.h5/ct_hu_3d").split("/")[-1]
+
+
+_OVERLAY_POOL = ThreadPoolExecutor(max_workers=6, thread_name_prefix="overlay")
+
+
+def _structure_boundary(
+    ss_data_path: Path, boundaries_path: Optional[Path], ds_name: str, slice_idx: int
+) -> Optional[np.ndarray]:
+    """Outline of one structure on slice_idx, or None if the mask is missing or too short."""
+    mask = _h5_dataset(ss_data_path, ds_name, **_SS_CHUNK_CACHE)
+    if mask is None or slice_idx >= mask.shape[0]:
+        return None
+    packed = _h5_dataset(boundaries_path, ds_name) if boundaries_path is not None else None
+    if packed is not None:
+        return np.unpackbits(_read_slice(packed, slice_idx), axis=-1, count=int(packed.attrs["width"]))
+    return _mask_boundary(_read_slice(mask, slice_idx))
 
 
 def _overlay_contours(
@@ -290,20 +829,9 @@ def _overlay_contours(
 ) -> bool:
     """Draw simple contour outlines for selected structures onto a PIL image."""
     try:
-        import json
-        from PIL import ImageDraw
+        from PIL import Image
 
-        with ss_meta_path.open() as f:
-            structs_meta = json.load(f)
-        names = structs_meta["structures"]["name"] if isinstance(structs_meta, dict) and "structures" in structs_meta else [
-            s["name"] for s in structs_meta
-        ]
-        mask_files = (
-            structs_meta["structures"]["structure_mask_3d_File"]
-            if isinstance(structs_meta, dict) and "structures" in structs_meta
-            else [s["structure_mask_3d_File"] for s in structs_meta]
-        )
-        structs = list(zip(names, mask_files))
+        structs = _load_ss_meta(str(ss_meta_path), ss_meta_path.stat().st_mtime_ns)
         if struct_filter:
             structs = [s for s in structs if s[0] in struct_filter]
         else:
@@ -318,26 +846,30 @@ def _overlay_contours(
             "LUNG_L": (255, 128, 0, 180),
             "LUNG_R": (255, 0, 255, 180),
         }
-        drawn = False
-        with h5py.File(ss_data_path, "r") as h5:
-            for name, mask_path in structs:
-                ds_name = mask_path.split("/")[-1]
-                if ds_name not in h5:
-                    continue
-                mask = h5[ds_name]
-                if slice_idx >= mask.shape[0]:
-                    continue
-                mask_slice = mask[slice_idx, :, :]
-                boundary = mask_slice & ~binary_erosion(mask_slice)
-                if not boundary.any():
-                    continue
-                draw = ImageDraw.Draw(pil_img, "RGBA")
-                color = colors.get(name.upper(), (255, 255, 255, 180))
-                ys, xs = np.nonzero(boundary)
-                for x, y in zip(xs.tolist(), ys.tolist()):
-                    draw.point((x, y), fill=color)
-                drawn = True
-        return drawn
+        boundaries_path = _ensure_boundaries(ss_data_path.parent)
+        futures = [
+            (name, _OVERLAY_POOL.submit(_structure_boundary, ss_data_path, boundaries_path, ds_name, slice_idx))
+            for name, ds_name in structs
+        ]
+        # Accumulate every outline into one RGBA buffer, later structures overwriting
+        # earlier ones where they overlap, then paste once. Like the old per-pixel
+        # draw.point this replaces boundary pixels (alpha included) rather than blending.
+        width, height = pil_img.size
+        overlay = np.zeros((height, width, 4), dtype=np.uint8)
+        covered = np.zeros((height, width), dtype=bool)
+        for name, future in futures:
+            boundary = future.result()
+            if boundary is None:
+                continue
+            boundary = boundary.view(bool)
+            if not boundary.any():
+                continue
+            overlay[boundary] = colors.get(name.upper(), (255, 255, 255, 180))
+            covered |= boundary
+        if not covered.any():
+            return False
+        pil_img.paste(Image.fromarray(overlay, "RGBA"), mask=Image.fromarray(covered.view(np.uint8) * 255, "L"))
+        return True
     except Exception:
         return False
 
@@ -346,7 +878,10 @@ def _overlay_contours(
 def ensure_patient_route(case_id: str) -> Dict[str, Any]:
     try:
         print(f"[ensure_patient] requested {case_id}")
+        _drop_h5_handles(_portpy_repo() / "data" / case_id)
+        _clear_response_cache(case_id)
         patient_dir = ensure_patient_local(case_id, portpy_repo=_portpy_repo())
+        _invalidate_case_caches()
         print(f"[ensure_patient] {case_id} available at {patient_dir}")
         return {"case_id": case_id, "path": str(patient_dir)}
     except Exception as exc:  # noqa: BLE001
@@ -360,12 +895,13 @@ def optimize(config: Optional[Dict[str, Any]] = None, background_tasks: Backgrou
     merged_config = default_config()
     if config:
         merged_config.update(config)
-    run_id = generate_run_id(merged_config)
+    config_bytes = canonical_config(merged_config)
+    run_id = generate_run_id(merged_config, config_bytes)
     append_log_line(run_id, f"[{run_id}] queued")
     if background_tasks is None:
-        _run_job(run_id, merged_config)
+        _run_job(run_id, merged_config, config_bytes)
     else:
-        background_tasks.add_task(_run_job, run_id, merged_config)
+        background_tasks.add_task(_run_job, run_id, merged_config, config_bytes)
     return {"run_id": run_id, "status": "queued"}
 
 
@@ -381,21 +917,36 @@ def get_run(run_id: str) -> Dict[str, Any]:
     # Avoid rehydrating reference runs so we do not rebuild influence matrices/BEV
     if not _is_reference_artifacts(artifacts):
         artifacts = _rehydrate_artifacts(artifacts)
-    return {"run_id": run_id, "status": status, "artifacts": artifacts}
+    dose_info = artifacts.get("dose")
+    if dose_info and dose_info.get("dose_1d") is not None:
+        artifacts["dose"] = _encode_dose_1d(dose_info)
+    return _json_response({"run_id": run_id, "status": status, "artifacts": artifacts})
+
+
+def _encode_dose_1d(dose_info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Swap dose_1d for its raw little-endian float bytes, base64-encoded: one C pass over the
+    buffer instead of a JSON number per voxel. The web client decodes it into a typed array.
+    """
+    arr = np.asarray(dose_info["dose_1d"])
+    if arr.dtype.str not in ("<f4", "<f8"):
+        arr = arr.astype("<f8")
+    encoded = {k: v for k, v in dose_info.items() if k != "dose_1d"}
+    encoded["dose_1d_b64"] = base64.b64encode(np.ascontiguousarray(arr)).decode("ascii")
+    encoded["dose_1d_dtype"] = arr.dtype.str
+    return encoded
 
 
 @app.get("/runs/{run_id}/logs")
 def get_run_logs(run_id: str) -> Dict[str, Any]:
     lines = load_log_lines(run_id)
-    artifacts = load_run(run_id)
-    status = artifacts.get("logs", {}).get("status", "unknown")
+    status = load_run_status(run_id)
     return {"run_id": run_id, "status": status, "lines": lines}
 
 
 @app.get("/runs/{run_id}/progress")
 def get_run_progress(run_id: str) -> Dict[str, Any]:
-    artifacts = load_run(run_id)
-    status = artifacts.get("logs", {}).get("status", "unknown")
+    status = load_run_status(run_id)
     progress = load_progress(run_id)
     return {"run_id": run_id, "status": status, "progress": progress}
 
@@ -419,7 +970,7 @@ def list_runs(case_id: Optional[str] = None) -> Dict[str, Any]:
         if not cfg_path.exists():
             continue
         try:
-            cfg = _read_json(cfg_path)
+            cfg = read_json(cfg_path)
         except Exception:
             cfg = {}
         if not isinstance(cfg, dict):
@@ -428,11 +979,11 @@ def list_runs(case_id: Optional[str] = None) -> Dict[str, Any]:
         if case_id and patient and patient != case_id:
             continue
         try:
-            logs = _read_json(logs_path) if logs_path.exists() else {}
+            logs = read_json(logs_path) if logs_path.exists() else {}
         except Exception:
             logs = {}
         try:
-            solver = _read_json(solver_path) if solver_path.exists() else {}
+            solver = read_json(solver_path) if solver_path.exists() else {}
         except Exception:
             solver = {}
         status = logs.get("status") or solver.get("status") or "unknown"
@@ -505,8 +1056,7 @@ def _rehydrate_artifacts(artifacts: Dict[str, Any]) -> Dict[str, Any]:
         plan = pp.Plan(ct=ct, structs=structs, beams=beams, inf_matrix=inf_matrix, clinical_criteria=clinical_criteria)
         dose_3d = None
         if dose_info.get("dose_3d_path") and Path(dose_info["dose_3d_path"]).exists():
-            with np.load(dose_info["dose_3d_path"]) as npz:
-                dose_3d = npz["dose_3d"]
+            dose_3d = load_dose_array(Path(dose_info["dose_3d_path"]))
         if dose_3d is None:
             dose_3d = inf_matrix.dose_1d_to_3d(dose_1d=np.array(dose_1d))
         eval_obj = pp.Evaluation(my_plan=plan)
@@ -541,7 +1091,8 @@ def _is_reference_artifacts(artifacts: Dict[str, Any]) -> bool:
     if isinstance(run_id, str) and run_id.lower().endswith("reference"):
         return True
     # No dose_1d and no solver trace usually means a shipped reference bundle
-    if not dose.get("dose_1d") and not artifacts.get("solver_trace") and patient_plan and patient_plan == cfg.get("patient_id"):
+    dose_1d = dose.get("dose_1d")
+    if (dose_1d is None or len(dose_1d) == 0) and not artifacts.get("solver_trace") and patient_plan and patient_plan == cfg.get("patient_id"):
         return True
     return False
 
@@ -571,10 +1122,9 @@ def _materialize_run_dose(run_id: str, force: bool = False) -> np.ndarray:
     if not cfg or dose_1d is None:
         raise HTTPException(status_code=404, detail="Run dose not available for materialization")
 
-    cache_path = run_dir(run_id) / "dose_3d.npz"
-    if cache_path.exists() and not force:
-        with np.load(cache_path) as npz:
-            return npz["dose_3d"]
+    cached_path = dose_info.get("dose_3d_path")
+    if cached_path and not force:
+        return load_dose_array(Path(cached_path))
 
     try:
         import portpy.photon as pp  # type: ignore
@@ -602,7 +1152,7 @@ def _materialize_run_dose(run_id: str, force: bool = False) -> np.ndarray:
         )
         inf_matrix.dose_1d = np.array(dose_1d)
         dose_3d = inf_matrix.dose_1d_to_3d(dose_1d=np.array(dose_1d))
-        np.savez_compressed(cache_path, dose_3d=dose_3d)
+        save_dose_3d(run_id, dose_3d)
         return dose_3d
     except HTTPException:
         raise
@@ -637,12 +1187,10 @@ def _materialize_run_dose(run_id: str, force: bool = False) -> np.ndarray:
         return []
 
 
-@app.get("/runs/{run_id}/dose_slice/{slice_idx}")
-def get_run_dose_slice(
-    run_id: str, slice_idx: int, threshold_gy: Optional[float] = None, materialize: bool = False
-) -> Dict[str, Any]:
+def _run_dose_slice(run_id: str, slice_idx: int, materialize: bool) -> Tuple[Optional[np.ndarray], Optional[str]]:
     """
-    Return a dose overlay PNG for a given optimized run (rebuilds inf_matrix and maps dose_1d to CT grid).
+    Dose slice for an optimized run as (slice, None), or (None, case_id) for reference runs,
+    whose overlays come from the case's RT Dose.
     """
     artifacts = load_run(run_id)
     if _is_reference_artifacts(artifacts):
@@ -650,7 +1198,7 @@ def get_run_dose_slice(
         case_id = cfg.get("patient_id") or cfg.get("case_id") or artifacts.get("plan", {}).get("patient_id")
         if not case_id:
             raise HTTPException(status_code=400, detail="Reference run missing patient_id")
-        return get_dose_slice(case_id, slice_idx, threshold_gy)
+        return None, case_id
     cfg = artifacts.get("config")
     dose_info = artifacts.get("dose", {})
     dose_1d = dose_info.get("dose_1d")
@@ -661,8 +1209,7 @@ def get_run_dose_slice(
     dose_3d = None
     if dose3d_path and Path(dose3d_path).exists():
         try:
-            with np.load(dose3d_path) as npz:
-                dose_3d = npz["dose_3d"]
+            dose_3d = load_dose_array(Path(dose3d_path))
         except Exception as exc:
             raise HTTPException(status_code=500, detail=f"Failed to load cached dose: {exc}")
 
@@ -677,16 +1224,52 @@ def get_run_dose_slice(
 
     if slice_idx < 0 or slice_idx >= dose_3d.shape[0]:
         raise HTTPException(status_code=400, detail=f"slice_idx out of range (0-{dose_3d.shape[0]-1})")
+    return dose_3d[slice_idx, :, :], None
 
-    dose_slice = dose_3d[slice_idx, :, :]
-    overlay_png = _dose_overlay_png(dose_slice, threshold_gy=threshold_gy)
-    stats = {
-        "mean_gy": float(np.mean(dose_slice)),
-        "max_gy": float(np.max(dose_slice)),
-        "shape": list(dose_slice.shape),
-        "source": "optimized_run",
+
+def _run_dose_version(run_id: str) -> Optional[int]:
+    """mtime of the run's stored dose_3d (or dose_1d) file, used to version overlay URLs."""
+    rd = run_dir(run_id)
+    for stem in ("dose_3d", "dose"):
+        for suffix in (".npy", ".b2nd", ".npz"):
+            mtime = _mtime_ns(rd / f"{stem}{suffix}")
+            if mtime is not None:
+                return mtime
+    return None
+
+
+@app.get("/runs/{run_id}/dose_slice/{slice_idx}.png")
+def get_run_dose_slice_png(
+    run_id: str, slice_idx: int, threshold_gy: Optional[float] = None, materialize: bool = False
+) -> Response:
+    """Return the dose overlay for an optimized run slice as raw PNG bytes."""
+    dose_slice, case_id = _run_dose_slice(run_id, slice_idx, materialize)
+    if case_id is not None:
+        return get_dose_slice_png(case_id, slice_idx, threshold_gy)
+    png = _dose_overlay_png(dose_slice, threshold_gy=threshold_gy)
+    return Response(content=png, media_type="image/png", headers={"Cache-Control": _DOSE_PNG_CACHE_CONTROL})
+
+
+@app.get("/runs/{run_id}/dose_slice/{slice_idx}")
+def get_run_dose_slice(
+    run_id: str, slice_idx: int, threshold_gy: Optional[float] = None, materialize: bool = False
+) -> Dict[str, Any]:
+    """
+    Return stats and the overlay PNG URL for an optimized run slice (the dose_3d must be cached,
+    or materialize=1 maps dose_1d to the CT grid first).
+    """
+    dose_slice, case_id = _run_dose_slice(run_id, slice_idx, materialize)
+    if case_id is not None:
+        return get_dose_slice(case_id, slice_idx, threshold_gy)
+    stats = _dose_slice_stats(dose_slice)
+    stats["source"] = "optimized_run"
+    return {
+        "slice_index": slice_idx,
+        "overlay_url": _dose_overlay_url(
+            f"/runs/{quote(run_id)}", slice_idx, threshold_gy, _run_dose_version(run_id)
+        ),
+        "stats": stats,
     }
-    return {"slice_index": slice_idx, "overlay_png": overlay_png, "stats": stats}
 
 
 @app.post("/runs/{run_id}/materialize_dose")
@@ -731,7 +1314,7 @@ def solver_health() -> Dict[str, Any]:
     return _to_native(info)
 
 
-def _run_job(run_id: str, config: Dict[str, Any]) -> None:
+def _run_job(run_id: str, config: Dict[str, Any], config_bytes: Optional[bytes] = None) -> None:
     try:
         append_log_line(run_id, f"[{run_id}] started")
         with _capture_solver_output(run_id, parser=_progress_parser(run_id)):
@@ -749,8 +1332,9 @@ def _run_job(run_id: str, config: Dict[str, Any]) -> None:
             result.update({k: v for k, v in rehydrated.items() if v is not None})
         except Exception:
             pass
-        # Convert to native types to avoid numpy serialization issues
-        result = _to_native(result)
+        # Convert to native types to avoid numpy serialization issues. The dose arrays stay
+        # ndarrays: save_run_artifacts writes them as .npy in their own dtype.
+        result = {k: v if k == "dose" else _to_native(v) for k, v in result.items()}
         solver_status = result.get("solver_trace", {}).get("status", "unknown")
         # Normalize solver statuses so the UI can treat them as completed runs
         if solver_status in ("optimal", "optimal_inaccurate", "inaccurate", "feasible"):
@@ -760,7 +1344,10 @@ def _run_job(run_id: str, config: Dict[str, Any]) -> None:
             if result.get("dose") or result.get("dvh"):
                 solver_status = "completed"
         append_log_line(run_id, f"[{run_id}] {solver_status}")
-        save_run_artifacts(run_id, result)
+        # The run id's canonical bytes double as config.json unless the runner filled in defaults.
+        if config_bytes is not None and result.get("config_used") != config:
+            config_bytes = None
+        save_run_artifacts(run_id, result, config_bytes=config_bytes)
         # overwrite logs.json with solver status so polling stops
         from .storage import _write_json, run_dir
         _write_json(run_dir(run_id) / "logs.json", {"status": solver_status, "timestamp": time.time()})
@@ -772,24 +1359,53 @@ def _run_job(run_id: str, config: Dict[str, Any]) -> None:
         _write_json(run_dir(run_id) / "logs.json", {"status": "failed", "timestamp": time.time(), "error": str(exc)})
 
 
+@lru_cache(maxsize=32)
+def _clinical_criteria(case_id: str, protocol: str):
+    """PortPy ClinicalCriteria for a case/protocol; shared by manifests and reference dose."""
+    import portpy.photon as pp  # type: ignore
+
+    data = pp.DataExplorer(data_dir=str(_portpy_repo() / "data"))
+    data.patient_id = case_id
+    return pp.ClinicalCriteria(data, protocol_name=protocol)
+
+
+@lru_cache(maxsize=32)
+def _prescription(case_id: str, protocol: str) -> Tuple[Optional[float], Optional[int]]:
+    """(prescription_gy, num_fractions) for a case/protocol."""
+    clinical_criteria = _clinical_criteria(case_id, protocol)
+    return clinical_criteria.get_prescription(), clinical_criteria.get_num_of_fractions()
+
+
 def _load_case_manifest(case_id: str) -> Optional[Dict[str, Any]]:
-    meta_dir = _portpy_repo() / "metadata" / case_id
-    data_meta_dir = _portpy_repo() / "data" / case_id
-
-    ss_path = meta_dir / "StructureSet_MetaData.json"
-    beams_path = meta_dir / "Beams"
-    if not ss_path.exists():
-        ss_path = data_meta_dir / "StructureSet_MetaData.json"
-        beams_path = data_meta_dir / "Beams"
-    if not ss_path.exists():
+    missing_since = _MISSING_CASES.get(case_id)
+    if missing_since is not None and time.monotonic() - missing_since < _CASE_CACHE_TTL_S:
         return None
-    with ss_path.open() as f:
-        structs = json.load(f)
+    for case_dir in (_portpy_repo() / "metadata" / case_id, _portpy_repo() / "data" / case_id):
+        mtime_ns = _mtime_ns(case_dir / "StructureSet_MetaData.json")
+        if mtime_ns is not None:
+            _MISSING_CASES.pop(case_id, None)
+            # Adding/replacing beam metadata bumps the Beams directory mtime, which also
+            # invalidates the cached manifest.
+            mtime_token = max(mtime_ns, _mtime_ns(case_dir / "Beams") or 0)
+            return _build_case_manifest(case_id, str(case_dir), mtime_token)
+    _MISSING_CASES[case_id] = time.monotonic()
+    return None
+
+
+@lru_cache(maxsize=256)
+def _build_case_manifest(case_id: str, case_dir: str, mtime_token: int) -> Dict[str, Any]:
+    """Build the case manifest; cached per (case, newest of StructureSet metadata / Beams dir mtime)."""
+    ss_path = Path(case_dir) / "StructureSet_MetaData.json"
+    beams_path = Path(case_dir) / "Beams"
+    structs = read_json(ss_path)
     beams = []
-    if beams_path.exists():
-        for path in beams_path.glob("Beam_*_MetaData.json"):
-            with path.open() as f:
-                data = json.load(f)
+    try:
+        entries = list(os.scandir(beams_path))
+    except OSError:
+        entries = []
+    for entry in entries:
+        if entry.name.startswith("Beam_") and entry.name.endswith("_MetaData.json"):
+            data = read_json(Path(entry.path))
             beams.append({"id": _to_native(data.get("ID")), "gantry_angle": _to_native(data.get("gantry_angle"))})
 
     # Load default objectives from PortPy config
@@ -801,13 +1417,7 @@ def _load_case_manifest(case_id: str) -> Optional[Dict[str, Any]]:
         objs = default_schema(portpy_repo, default_config().get("protocol_global_opt", ""))
         objs = _to_native(objs)
         try:
-            import portpy.photon as pp  # type: ignore
-
-            data = pp.DataExplorer(data_dir=str(_portpy_repo() / "data"))
-            data.patient_id = case_id
-            clinical_criteria = pp.ClinicalCriteria(data, protocol_name=default_config().get("protocol_global_opt", ""))
-            pres_gy = clinical_criteria.get_prescription()
-            num_fx = clinical_criteria.get_num_of_fractions()
+            pres_gy, num_fx = _prescription(case_id, default_config().get("protocol_global_opt", ""))
         except Exception:
             pres_gy = None
             num_fx = None
@@ -839,7 +1449,119 @@ def _find_rt_plan(case_dir: Path) -> Optional[Path]:
     return candidates[0] if candidates else None
 
 
+# Resampling the RT Dose onto the CT grid is the slow part of every dose request. The result
+# is kept on disk next to the case (one uncompressed chunk per axial slice) and the most
+# recent volumes stay in memory; both are keyed by the RT Dose file's mtime.
+_DOSE_CACHE_FILE = "DoseCache.h5"
+_DOSE_MEM_CACHE_SIZE = 2
+_DOSE_MEM_CACHE: "OrderedDict[Tuple[str, str, int], np.ndarray]" = OrderedDict()
+_DOSE_LOCK = threading.Lock()
+# One lock per case so concurrent cold requests resample and write DoseCache.h5 only once.
+_DOSE_BUILD_LOCKS: Dict[str, threading.Lock] = {}
+
+
+def _dose_build_lock(case_id: str) -> threading.Lock:
+    with _DOSE_LOCK:
+        lock = _DOSE_BUILD_LOCKS.get(case_id)
+        if lock is None:
+            lock = _DOSE_BUILD_LOCKS[case_id] = threading.Lock()
+        return lock
+
+
+def _cached_dose_path(case_id: str) -> Path:
+    return _portpy_repo() / "data" / case_id / _DOSE_CACHE_FILE
+
+
+def _dose_cache_dataset(case_id: str, rt_dose_path: Path, src_mtime: int) -> Optional[h5py.Dataset]:
+    """The cached resampled dose dataset, or None if missing or built from another RT Dose."""
+    cache_path = _cached_dose_path(case_id)
+    if _mtime_ns(cache_path) is None:
+        return None
+    try:
+        h5, _ = _open_h5_entry(cache_path, rdcc_nbytes=32 << 20)
+        if h5.attrs.get("source_mtime_ns") != src_mtime or h5.attrs.get("source") != rt_dose_path.name:
+            return None
+        return _h5_dataset(cache_path, "dose")
+    except Exception:
+        return None
+
+
+def _write_dose_cache(case_id: str, rt_dose_path: Path, src_mtime: int, dose_3d: np.ndarray) -> None:
+    """Best-effort write of DoseCache.h5 via a temp file so readers never see a partial cache."""
+    cache_path = _cached_dose_path(case_id)
+    tmp_path = cache_path.with_name(f".{_DOSE_CACHE_FILE}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with h5py.File(tmp_path, "w") as h5:
+            h5.create_dataset("dose", data=dose_3d, chunks=(1,) + dose_3d.shape[1:])
+            h5.attrs["source"] = rt_dose_path.name
+            h5.attrs["source_mtime_ns"] = src_mtime
+        _drop_h5_handle(cache_path)
+        os.replace(tmp_path, cache_path)
+    except Exception as exc:
+        print(f"[dose_cache] failed to write {cache_path}: {exc!r}")
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+
+
 def _load_dose_resampled_to_ct(case_id: str, rt_dose_path: Path) -> np.ndarray:
+    """
+    Reference dose on the CT grid (float32, read-only), served from the in-memory LRU, then
+    DoseCache.h5, and only resampled from the RT Dose DICOM when neither matches its mtime.
+    """
+    src_mtime = rt_dose_path.stat().st_mtime_ns
+    key = (case_id, str(rt_dose_path), src_mtime)
+    with _DOSE_LOCK:
+        dose_3d = _DOSE_MEM_CACHE.get(key)
+        if dose_3d is not None:
+            _DOSE_MEM_CACHE.move_to_end(key)
+            return dose_3d
+    with _dose_build_lock(case_id):
+        # Another request may have filled the caches while we waited for the lock.
+        with _DOSE_LOCK:
+            dose_3d = _DOSE_MEM_CACHE.get(key)
+            if dose_3d is not None:
+                _DOSE_MEM_CACHE.move_to_end(key)
+                return dose_3d
+        ds = _dose_cache_dataset(case_id, rt_dose_path, src_mtime)
+        if ds is not None:
+            dose_3d = np.empty(ds.shape, dtype=np.float32)
+            ds.read_direct(dose_3d)
+        else:
+            dose_3d = _resample_dose_to_ct(case_id, rt_dose_path)
+            _write_dose_cache(case_id, rt_dose_path, src_mtime, dose_3d)
+        dose_3d.flags.writeable = False
+        with _DOSE_LOCK:
+            _DOSE_MEM_CACHE[key] = dose_3d
+            while len(_DOSE_MEM_CACHE) > _DOSE_MEM_CACHE_SIZE:
+                _DOSE_MEM_CACHE.popitem(last=False)
+    return dose_3d
+
+
+def _load_dose_slice(case_id: str, rt_dose_path: Path, slice_idx: int) -> Tuple[Optional[np.ndarray], int]:
+    """
+    One axial slice of the resampled dose plus the slice count; the slice is None when out of
+    range. A cold process reads just that slice from DoseCache.h5 instead of the whole volume.
+    """
+    src_mtime = rt_dose_path.stat().st_mtime_ns
+    with _DOSE_LOCK:
+        dose_3d = _DOSE_MEM_CACHE.get((case_id, str(rt_dose_path), src_mtime))
+    if dose_3d is None:
+        ds = _dose_cache_dataset(case_id, rt_dose_path, src_mtime)
+        if ds is not None:
+            num_slices = ds.shape[0]
+            if slice_idx < 0 or slice_idx >= num_slices:
+                return None, num_slices
+            return _read_slice(ds, slice_idx).astype(np.float32, copy=False), num_slices
+        dose_3d = _load_dose_resampled_to_ct(case_id, rt_dose_path)
+    num_slices = dose_3d.shape[0]
+    if slice_idx < 0 or slice_idx >= num_slices:
+        return None, num_slices
+    return dose_3d[slice_idx, :, :], num_slices
+
+
+def _resample_dose_to_ct(case_id: str, rt_dose_path: Path) -> np.ndarray:
     """
     Load RT Dose DICOM and resample to the CT grid using PortPy utilities.
     Falls back to raw pydicom pixel data if conversion fails.
@@ -868,52 +1590,116 @@ def _load_dose_resampled_to_ct(case_id: str, rt_dose_path: Path) -> np.ndarray:
     return np.asarray(dose_3d, dtype=np.float32)
 
 
+# Per-structure DVH/criteria work (NumPy gathers and bincounts release the GIL).
+_ANALYSIS_POOL = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="analysis")
+
+
+def _load_structure_masks(
+    ss_data_path: Path, structs, shape: Tuple[int, ...]
+) -> Dict[str, np.ndarray]:
+    """Bool masks by structure name for (name, dataset) pairs whose mask matches shape."""
+    masks: Dict[str, np.ndarray] = {}
+    h5 = _open_ss(ss_data_path)
+    for name, ds_name in structs:
+        if ds_name not in h5:
+            continue
+        ds = h5[ds_name]
+        if ds.shape == shape:
+            masks[name] = _read_mask(ds)
+    return masks
+
+
+_DVH_DEFAULT_STRUCTURES = {"PTV", "CORD", "ESOPHAGUS", "HEART", "LUNG_L", "LUNG_R"}
+
+
+def _dvh_structure_names(structs, struct_filter: Optional[List[str]] = None) -> List[str]:
+    """Structure names (in structure-set order) that get a DVH curve."""
+    keep = set(struct_filter) if struct_filter else _DVH_DEFAULT_STRUCTURES
+    return [name for name, _ in structs if name in keep]
+
+
+def _criteria_structure_names(clinical_criteria) -> set:
+    """Structure names referenced by a PortPy ClinicalCriteria protocol."""
+    criteria = getattr(clinical_criteria, "clinical_criteria_dict", {}).get("criteria", [])
+    return {c.get("parameters", {}).get("structure_name") for c in criteria} - {None}
+
+
+def _analyze_dose(
+    dose_3d: np.ndarray,
+    masks: Dict[str, np.ndarray],
+    names=None,
+    num_bins: int = 400,
+) -> Tuple[np.ndarray, Dict[str, Dict[str, Any]]]:
+    """
+    Per-structure dose statistics shared by DVH and clinical criteria.
+    The dose is quantised once onto a global bin axis (num_bins - 1 bins over [0, max]);
+    each structure then gets one gather + bincount. Returns (dose_axis, stats) where
+    stats[name] = {"vals", "hist", "Dmean", "Dmax"}; empty structures are omitted.
+    """
+    max_global = float(dose_3d.max()) if dose_3d.size else 0.0
+    edges = np.linspace(0, max_global if max_global > 0 else 0.1, num_bins)
+    n_hist = num_bins - 1
+    bin_idx = np.empty(dose_3d.shape, dtype=np.uint16)
+    np.clip(dose_3d * (n_hist / edges[-1]), 0, n_hist - 1, out=bin_idx, casting="unsafe")
+    dose_axis = edges[:-1]
+
+    def one_structure(mask: np.ndarray) -> Optional[Dict[str, Any]]:
+        vals = dose_3d[mask]
+        if vals.size == 0:
+            return None
+        return {
+            "vals": vals,
+            "hist": np.bincount(bin_idx[mask], minlength=n_hist),
+            "Dmean": float(np.mean(vals)),
+            "Dmax": float(vals.max()),
+        }
+
+    if names is None:
+        names = masks.keys()
+    # The gathers/bincounts release the GIL, so structures are processed concurrently.
+    futures = [(name, _ANALYSIS_POOL.submit(one_structure, masks[name])) for name in names if name in masks]
+    stats: Dict[str, Dict[str, Any]] = {}
+    for name, future in futures:
+        result = future.result()
+        if result is not None:
+            stats[name] = result
+    return dose_axis, stats
+
+
 def _compute_dvh_from_dose(
     dose_3d: np.ndarray,
     ss_meta_path: Path,
     ss_data_path: Path,
     struct_filter: Optional[List[str]] = None,
     num_bins: int = 400,
+    masks: Optional[Dict[str, np.ndarray]] = None,
+    analysis: Optional[Tuple[np.ndarray, Dict[str, Dict[str, Any]]]] = None,
 ) -> tuple[Dict[str, Any], Dict[str, Any]]:
-    """Compute DVH curves and simple metrics from a 3D dose and structure masks."""
-    with ss_meta_path.open() as f:
-        ss_meta = json.load(f)
-    if isinstance(ss_meta, dict) and "structures" in ss_meta:
-        names = ss_meta["structures"].get("name", [])
-        mask_files = ss_meta["structures"].get("structure_mask_3d_File", [])
-    else:
-        names = [s.get("name") for s in ss_meta]
-        mask_files = [s.get("structure_mask_3d_File") for s in ss_meta]
-    structs = list(zip(names, mask_files))
-    if struct_filter:
-        structs = [s for s in structs if s[0] in struct_filter]
-    else:
-        keep = {"PTV", "CORD", "ESOPHAGUS", "HEART", "LUNG_L", "LUNG_R"}
-        structs = [s for s in structs if s[0] in keep]
+    """
+    Compute DVH curves and simple metrics from a 3D dose and structure masks.
+    Pass masks (from _load_structure_masks) or analysis (from _analyze_dose) to reuse work
+    already done for this dose.
+    """
+    structs = _load_ss_meta(str(ss_meta_path), ss_meta_path.stat().st_mtime_ns)
+    names = _dvh_structure_names(structs, struct_filter)
+    if analysis is None:
+        if masks is None:
+            # Masks whose shape differs from the dose are skipped to avoid misleading DVHs.
+            masks = _load_structure_masks(ss_data_path, structs, dose_3d.shape)
+        analysis = _analyze_dose(dose_3d, masks, names, num_bins=num_bins)
+    dose_axis, stats = analysis
 
     dvh: Dict[str, Any] = {}
     metrics: Dict[str, Any] = {}
-    with h5py.File(ss_data_path, "r") as h5:
-        for name, mask_path in structs:
-            if not name or not mask_path:
-                continue
-            ds_name = mask_path.split("/")[-1]
-            if ds_name not in h5:
-                continue
-            mask = h5[ds_name][()]
-            if mask.shape != dose_3d.shape:
-                # Shape mismatch; skip to avoid misleading DVH
-                continue
-            vals = dose_3d[mask.astype(bool)]
-            if vals.size == 0:
-                continue
-            max_dose = float(vals.max())
-            bins = np.linspace(0, max_dose if max_dose > 0 else 0.1, num_bins)
-            hist, edges = np.histogram(vals, bins=bins)
-            cumulative = np.cumsum(hist[::-1])[::-1]
-            volume_perc = (cumulative / cumulative[0] * 100.0) if cumulative[0] > 0 else np.zeros_like(cumulative)
-            dvh[name] = {"dose_gy": edges[:-1].tolist(), "volume_perc": volume_perc.tolist()}
-            metrics[name] = {"Dmean": float(np.mean(vals)), "Dmax": max_dose}
+    for name in names:
+        st = stats.get(name)
+        if st is None:
+            continue
+        cumulative = np.cumsum(st["hist"][::-1])[::-1]
+        volume_perc = (cumulative / cumulative[0] * 100.0) if cumulative[0] > 0 else np.zeros_like(cumulative)
+        # Kept as arrays: orjson serialises them directly (see _json_response).
+        dvh[name] = {"dose_gy": dose_axis, "volume_perc": volume_perc}
+        metrics[name] = {"Dmean": st["Dmean"], "Dmax": st["Dmax"]}
     return dvh, metrics
 
 
@@ -923,73 +1709,55 @@ def _clinical_criteria_from_dose(
     ss_data_path: Path,
     clinical_criteria,
     prescription_gy: Optional[float],
+    masks: Optional[Dict[str, np.ndarray]] = None,
+    analysis: Optional[Tuple[np.ndarray, Dict[str, Dict[str, Any]]]] = None,
 ) -> List[Dict[str, Any]]:
     """Compute clinical criteria plan values directly from dose and structure masks."""
-    try:
-        with ss_meta_path.open() as f:
-            ss_meta = json.load(f)
-        if isinstance(ss_meta, dict) and "structures" in ss_meta:
-            names = ss_meta["structures"].get("name", [])
-            mask_files = ss_meta["structures"].get("structure_mask_3d_File", [])
-        else:
-            names = [s.get("name") for s in ss_meta]
-            mask_files = [s.get("structure_mask_3d_File") for s in ss_meta]
-        name_to_mask = {}
-        with h5py.File(ss_data_path, "r") as h5:
-            for n, mf in zip(names, mask_files):
-                if not n or not mf:
-                    continue
-                ds_name = mf.split("/")[-1]
-                if ds_name in h5:
-                    mask = h5[ds_name][()]
-                    if mask.shape == dose_3d.shape:
-                        name_to_mask[n] = mask.astype(bool)
-    except Exception:
-        return []
+    if analysis is None:
+        if masks is None:
+            try:
+                structs = _load_ss_meta(str(ss_meta_path), ss_meta_path.stat().st_mtime_ns)
+                masks = _load_structure_masks(ss_data_path, structs, dose_3d.shape)
+            except Exception:
+                return []
+        analysis = _analyze_dose(dose_3d, masks, _criteria_structure_names(clinical_criteria))
+    stats = analysis[1]
 
     pres = prescription_gy or 1.0
     table: List[Dict[str, Any]] = []
 
+    criteria = getattr(clinical_criteria, "clinical_criteria_dict", {}).get("criteria", [])
+
+    def struct_vals(struct: str) -> Optional[np.ndarray]:
+        st = stats.get(struct)
+        return st["vals"] if st is not None else None
+
     def plan_value_max(struct: str) -> Optional[float]:
-        m = name_to_mask.get(struct)
-        if m is None:
-            return None
-        vals = dose_3d[m]
-        if vals.size == 0:
-            return None
-        return float(np.max(vals))
+        st = stats.get(struct)
+        return st["Dmax"] if st is not None else None
 
     def plan_value_mean(struct: str) -> Optional[float]:
-        m = name_to_mask.get(struct)
-        if m is None:
-            return None
-        vals = dose_3d[m]
-        if vals.size == 0:
-            return None
-        return float(np.mean(vals))
+        st = stats.get(struct)
+        return st["Dmean"] if st is not None else None
 
     def plan_value_v(struct: str, dose: float) -> Optional[float]:
-        m = name_to_mask.get(struct)
-        if m is None:
-            return None
-        vals = dose_3d[m]
-        if vals.size == 0:
+        vals = struct_vals(struct)
+        if vals is None:
             return None
         return float(np.sum(vals >= dose) / vals.size * 100.0)
 
     def plan_value_d(struct: str, volume_perc: float) -> Optional[float]:
-        m = name_to_mask.get(struct)
-        if m is None:
+        vals = struct_vals(struct)
+        if vals is None:
             return None
-        vals = dose_3d[m]
-        if vals.size == 0:
-            return None
-        # dose at volume_perc% (descending)
-        sorted_vals = np.sort(vals)[::-1]
-        idx = int(np.clip(volume_perc / 100.0 * (len(sorted_vals) - 1), 0, len(sorted_vals) - 1))
-        return float(sorted_vals[idx])
-
-    for crit in getattr(clinical_criteria, "clinical_criteria_dict", {}).get("criteria", []):
+        # dose at volume_perc% (descending): position idx of the descending order is the
+        # (N-1-idx)-th smallest value, which np.partition selects in O(N) without a full sort.
+        n = vals.size
+        idx = int(np.clip(volume_perc / 100.0 * (n - 1), 0, n - 1))
+        k = n - 1 - idx
+        return float(np.partition(vals, k)[k])
+
+    for crit in criteria:
         ctype = crit.get("type")
         params = crit.get("parameters", {})
         cons = crit.get("constraints", {})
@@ -1041,19 +1809,8 @@ def _clinical_criteria_from_dose(
     return table
 
 
-def _dose_overlay_png(dose_slice: np.ndarray, threshold_gy: Optional[float] = None) -> str:
-    """Create an Eclipse-like heatmap overlay PNG (base64 data URI) from a 2D dose slice."""
-    try:
-        from PIL import Image
-    except Exception as exc:  # noqa: BLE001
-        raise HTTPException(status_code=500, detail=f"PIL required for dose overlay: {exc}")
-
-    max_val = float(np.max(dose_slice)) if dose_slice.size else 0.0
-    if max_val <= 0:
-        max_val = 1e-6
-    norm = np.clip(dose_slice / max_val, 0.0, 1.0)
-    if threshold_gy is not None:
-        norm = np.where(dose_slice >= threshold_gy, norm, 0.0)
+def _build_dose_lut() -> np.ndarray:
+    """256-entry RGBA colour table for normalised dose 0..1."""
     # Eclipse-inspired ramp: deep blue -> cyan -> green -> yellow -> orange -> red -> magenta -> white
     stops = np.array([0.0, 0.18, 0.35, 0.5, 0.65, 0.8, 0.9, 1.0])
     palette = np.array(
@@ -1068,16 +1825,39 @@ def _dose_overlay_png(dose_slice: np.ndarray, threshold_gy: Optional[float] = No
             [255, 255, 255],
         ]
     )
-    r = np.interp(norm, stops, palette[:, 0]).astype(np.uint8)
-    g = np.interp(norm, stops, palette[:, 1]).astype(np.uint8)
-    b = np.interp(norm, stops, palette[:, 2]).astype(np.uint8)
-    a = np.clip(norm ** 0.8 * 210, 0, 210).astype(np.uint8)  # stronger at high dose, lighter at low
-    rgba = np.stack([r, g, b, a], axis=-1)
+    norm = np.linspace(0.0, 1.0, 256)
+    lut = np.empty((256, 4), dtype=np.uint8)
+    for c in range(3):
+        lut[:, c] = np.interp(norm, stops, palette[:, c]).astype(np.uint8)
+    lut[:, 3] = np.clip(norm ** 0.8 * 210, 0, 210).astype(np.uint8)  # stronger at high dose, lighter at low
+    return lut
+
+
+_DOSE_LUT = _build_dose_lut()
+
+
+def _dose_overlay_png(dose_slice: np.ndarray, threshold_gy: Optional[float] = None) -> bytes:
+    """Create an Eclipse-like heatmap overlay PNG from a 2D dose slice."""
+    try:
+        from PIL import Image
+    except Exception as exc:  # noqa: BLE001
+        raise HTTPException(status_code=500, detail=f"PIL required for dose overlay: {exc}")
+
+    max_val = float(np.max(dose_slice)) if dose_slice.size else 0.0
+    if max_val <= 0:
+        max_val = 1e-6
+    # Quantise to 256 levels (rounded) and colour with one table lookup per pixel.
+    scaled = np.clip(dose_slice * (255.0 / max_val), 0.0, 255.0)
+    scaled += 0.5
+    idx = scaled.astype(np.uint8)
+    if threshold_gy is not None:
+        idx[dose_slice < threshold_gy] = 0
+    rgba = _DOSE_LUT[idx]
     img = Image.fromarray(rgba, mode="RGBA")
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    image_b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-    return f"data:image/png;base64,{image_b64}"
+    return _encode_png(img)
+
+
+_ANSI_RE = re.compile(r"\x1b\[[0-9;]*[mK]")
 
 
 @contextmanager
@@ -1089,13 +1869,10 @@ def _capture_solver_output(run_id: str, parser=None):
     import os
     import sys
     import threading
-    import re
 
     # Skip noisy web access logs so the console stays focused on solver output.
-    ansi_re = re.compile(r"\x1b\[[0-9;]*[mK]")
-
     def _is_noise(line: str) -> bool:
-        plain = ansi_re.sub("", line)
+        plain = _ANSI_RE.sub("", line)
         if "HTTP/1.1" in plain and ("GET /" in plain or "POST /" in plain or "OPTIONS /" in plain):
             return True
         if plain.startswith("INFO:") and "Uvicorn running" in plain:
@@ -1104,18 +1881,37 @@ def _capture_solver_output(run_id: str, parser=None):
 
     r_fd, w_fd = os.pipe()
 
+    def handle(line: str) -> None:
+        line = line.rstrip()
+        if not line or _is_noise(line):
+            return
+        append_log_line(run_id, line)
+        if parser:
+            try:
+                parser(line)
+            except Exception:
+                pass
+
     def reader():
-        with os.fdopen(r_fd) as r:
-            for line in r:
-                line = line.rstrip()
-                if not line or _is_noise(line):
-                    continue
-                append_log_line(run_id, line)
-                if parser:
-                    try:
-                        parser(line)
-                    except Exception:
-                        pass
+        # Read in 64 KiB blocks and split lines ourselves; chatty solver logs otherwise
+        # cost a buffered readline round trip per line.
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        try:
+            while True:
+                chunk = os.read(r_fd, 1 << 16)
+                if not chunk:
+                    break
+                text = pending + decoder.decode(chunk)
+                lines = text.splitlines()
+                # Keep a trailing partial line until the rest of it arrives.
+                pending = lines.pop() if lines and not text.endswith(("\n", "\r")) else ""
+                for line in lines:
+                    handle(line)
+            for line in (pending + decoder.decode(b"", final=True)).splitlines():
+                handle(line)
+        finally:
+            os.close(r_fd)
 
     t = threading.Thread(target=reader, daemon=True)
     t.start()
@@ -1145,64 +1941,74 @@ def _capture_solver_output(run_id: str, parser=None):
             t.join(timeout=1.0)
         except Exception:
             pass
+        flush_logs()
+        flush_progress()
 
 
-def _progress_parser(run_id: str):
-    import re
-    import time
+# Solver progress lines; compiled once and matched via bound methods for every stdout line.
+_ITER_MATCH = re.compile(
+    r"^\s*(\d+)\s+([\-+\deE\.]+)\s+([\-+\deE\.]+)\s+([\-+\deE\.]+)\s+([\-+\deE\.]+)\s+([\-+\deE\.]+)"
+).match
+# MOSEK numeric iteration rows: an integer followed by at least three numeric fields
+# (which may read inf/nan when a residual blows up).
+_MOSEK_ITER_MATCH = re.compile(
+    r"^\s*(\d+)((?:\s+(?:[-+]?(?:inf|nan)|[-+\d.eE]+)){3,})\s*$", re.IGNORECASE
+).match
+_CVX_MIP_SEARCH = re.compile(r"\(CVXPY\).+:\s+(.*)").search
+_RUNTIME_SEARCH = re.compile(r"Runtime:\s*([0-9\.]+)").search
 
-    iter_re = re.compile(
-        r"^\s*(\d+)\s+([\-+\deE\.]+)\s+([\-+\deE\.]+)\s+([\-+\deE\.]+)\s+([\-+\deE\.]+)\s+([\-+\deE\.]+)"
-    )
-    cvx_mip_re = re.compile(r"\(CVXPY\).+:\s+(.*)")
-    runtime_re = re.compile(r"Runtime:\s*([0-9\.]+)")
 
+def _progress_parser(run_id: str):
     def parse(line: str) -> None:
-        m = iter_re.match(line)
-        if m:
-            it, pcost, dcost, gap, pres, dres = m.groups()
-            append_progress(
-                run_id,
-                {
-                    "iter": int(it),
-                    "pcost": float(pcost),
-                    "dcost": float(dcost),
-                    "gap": float(gap),
-                    "pres": float(pres),
-                    "dres": float(dres),
-                    "ts": time.time(),
-                },
-            )
-            return
-        # Heuristic for MOSEK numeric iteration lines: first token int, then numeric fields
-        tokens = line.strip().split()
-        if tokens and tokens[0].isdigit() and len(tokens) >= 4:
-            try:
-                it = int(tokens[0])
-                nums = [float(t) for t in tokens[1:]]
-                payload = {"iter": it, "ts": time.time()}
-                if len(nums) > 0:
-                    payload["pcost"] = nums[0]
-                if len(nums) > 1:
-                    payload["dcost"] = nums[1]
-                if len(nums) > 2:
-                    payload["gap"] = nums[2]
-                if len(nums) > 3:
-                    payload["pres"] = nums[3]
-                if len(nums) > 4:
-                    payload["dres"] = nums[4]
-                append_progress(run_id, payload)
+        # Most solver output matches none of the patterns; cheap prefix/substring checks
+        # keep those lines away from the regex engine.
+        stripped = line.lstrip()
+        if stripped[:1].isdigit():
+            m = _ITER_MATCH(line)
+            if m:
+                it, pcost, dcost, gap, pres, dres = m.groups()
+                append_progress(
+                    run_id,
+                    {
+                        "iter": int(it),
+                        "pcost": float(pcost),
+                        "dcost": float(dcost),
+                        "gap": float(gap),
+                        "pres": float(pres),
+                        "dres": float(dres),
+                        "ts": time.time(),
+                    },
+                )
                 return
-            except Exception:
-                pass
-        mr = runtime_re.search(line)
+            # Heuristic for MOSEK numeric iteration lines: first token int, then numeric fields
+            mi = _MOSEK_ITER_MATCH(line)
+            if mi:
+                try:
+                    it = int(mi.group(1))
+                    nums = [float(t) for t in mi.group(2).split()]
+                    payload = {"iter": it, "ts": time.time()}
+                    if len(nums) > 0:
+                        payload["pcost"] = nums[0]
+                    if len(nums) > 1:
+                        payload["dcost"] = nums[1]
+                    if len(nums) > 2:
+                        payload["gap"] = nums[2]
+                    if len(nums) > 3:
+                        payload["pres"] = nums[3]
+                    if len(nums) > 4:
+                        payload["dres"] = nums[4]
+                    append_progress(run_id, payload)
+                    return
+                except Exception:
+                    pass
+        mr = _RUNTIME_SEARCH(line) if "Runtime:" in line else None
         if mr:
             try:
                 append_progress(run_id, {"runtime_seconds": float(mr.group(1)), "ts": time.time()})
             except Exception:
                 pass
         # MOSEK/CVXPY MIP progress lines: "(CVXPY) ...: 0 1 1 0 2.8e+04 1.06e+03 96.2 83.2"
-        mm = cvx_mip_re.search(line)
+        mm = _CVX_MIP_SEARCH(line) if "(CVXPY)" in line else None
         if mm:
             tokens = mm.group(1).strip().split()
             values: list[float | None] = []
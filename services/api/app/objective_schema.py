@@ -4,10 +4,17 @@ Objective schema and adapter for the PortPy VMAT runner.
 from __future__ import annotations
 
 from copy import deepcopy
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
-import json
+from .storage import read_json
+
+
+@lru_cache(maxsize=32)
+def _objective_functions(cfg_path: str, mtime_ns: int) -> List[Dict[str, Any]]:
+    """Parsed objective_functions of an optimisation params file; cached per file version."""
+    return read_json(Path(cfg_path)).get("objective_functions", [])
 
 
 def load_default_objectives(portpy_repo: Path, protocol_name: str) -> List[Dict[str, Any]]:
@@ -18,9 +25,8 @@ def load_default_objectives(portpy_repo: Path, protocol_name: str) -> List[Dict[
         / "optimization_params"
         / f"optimization_params_{protocol_name}.json"
     )
-    with cfg_path.open() as f:
-        data = json.load(f)
-    return data.get("objective_functions", [])
+    # Copy so callers cannot mutate the cached list.
+    return deepcopy(_objective_functions(str(cfg_path), cfg_path.stat().st_mtime_ns))
 
 
 def default_schema(portpy_repo: Path, protocol_name: str) -> List[Dict[str, Any]]:
@@ -59,20 +65,21 @@ def apply_schema_to_opt_params(
 ) -> Dict[str, Any]:
     if not schema_overrides:
         return opt_params
-    updated = deepcopy(opt_params)
-    objs = updated.get("objective_functions", [])
+    # Only the objective dicts are modified, so copy those instead of deep-copying the params.
+    objs = [dict(obj) for obj in opt_params.get("objective_functions", [])]
+    updated = {**opt_params, "objective_functions": objs}
+    # (structure_name, type) -> matching objectives, so each override is one lookup.
+    index: Dict[Tuple[Any, Any], List[Dict[str, Any]]] = {}
+    for obj in objs:
+        index.setdefault((obj.get("structure_name"), obj.get("type")), []).append(obj)
     for override in schema_overrides:
-        struct = override.get("structure_name")
-        obj_type = override.get("type")
-        for obj in objs:
-            if obj.get("structure_name") == struct and obj.get("type") == obj_type:
-                if "weight" in override:
-                    obj["weight"] = override["weight"]
-                if "dose_gy" in override:
-                    obj["dose_gy"] = override["dose_gy"]
-                if "dose_perc" in override:
-                    obj["dose_perc"] = override["dose_perc"]
-    updated["objective_functions"] = objs
+        for obj in index.get((override.get("structure_name"), override.get("type")), ()):
+            if "weight" in override:
+                obj["weight"] = override["weight"]
+            if "dose_gy" in override:
+                obj["dose_gy"] = override["dose_gy"]
+            if "dose_perc" in override:
+                obj["dose_perc"] = override["dose_perc"]
     return updated
 
 
@@ -89,6 +96,8 @@ def _to_native(val):
         np = None
     if np is not None and isinstance(val, (np.generic,)):
         return val.item()
+    if np is not None and isinstance(val, np.ndarray):
+        return val.tolist()
     if isinstance(val, list):
         return [_to_native(v) for v in val]
     if isinstance(val, dict):
@@ -11,10 +11,9 @@ from __future__ import annotations
 
 import sys
 import time
-from copy import deepcopy
-import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import cvxpy as cp
 import numpy as np
@@ -52,6 +51,7 @@ def default_config() -> Dict[str, Any]:
         "objective_overrides": [],  # list of dicts (structure_name, type, weight, dose_gy/dose_perc)
         "metrics": _default_metrics_config(),
         "dvh_structures": ["PTV", "ESOPHAGUS", "HEART", "CORD", "LUNG_R"],
+        "dose_precision": "fp32",  # "fp64" keeps the full-precision dose for export
     }
 
 
@@ -129,7 +129,9 @@ def run_vmat_global_optimal(config: Optional[Dict[str, Any]] = None) -> Dict[str
     solve_time = time.time() - start_solve
 
     sol["inf_matrix"] = inf_matrix_db
-    sol["dose_1d"] = inf_matrix_db.A @ (sol["optimal_intensity"] * my_plan.get_num_of_fractions())
+    sol["dose_1d"] = _plan_dose(
+        inf_matrix_db.A, sol["optimal_intensity"] * my_plan.get_num_of_fractions(), cfg.get("dose_precision", "fp32")
+    )
     # Cache full 3D dose on the downsampled grid so slices can be served without rebuilding the matrix
     dose_3d = inf_matrix_db.dose_1d_to_3d(dose_1d=sol["dose_1d"])
 
@@ -182,8 +184,21 @@ def run_vmat_global_optimal(config: Optional[Dict[str, Any]] = None) -> Dict[str
 # --- helpers ---
 
 
+def _plan_dose(A, intensity: np.ndarray, precision: str = "fp32") -> np.ndarray:
+    """
+    Dose = A @ intensity. With fp32 and a float32 influence matrix (as PortPy stores it) the
+    intensities are cast down too, so the sparse matvec streams A as-is instead of upcasting
+    a float64 copy of it first. A float64 A is used unchanged: converting it would cost more
+    than the single product it feeds.
+    """
+    if precision == "fp32" and A.dtype == np.float32:
+        return A @ np.asarray(intensity, dtype=np.float32)
+    return A @ intensity
+
+
 def _merge_config(base: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
-    merged = deepcopy(base)
+    """Recursive merge; only dicts on an override path are copied, other values are shared with base."""
+    merged = dict(base)
     for k, v in overrides.items():
         if isinstance(v, dict) and isinstance(merged.get(k), dict):
             merged[k] = _merge_config(merged[k], v)
@@ -198,20 +213,21 @@ def _apply_objective_overrides(
     """Adjust objective weights/targets based on caller input."""
     if not overrides:
         return opt_params
-    updated = deepcopy(opt_params)
-    objs = updated.get("objective_functions", [])
+    # Only the objective dicts are modified, so copy those instead of deep-copying the params.
+    objs = [dict(obj) for obj in opt_params.get("objective_functions", [])]
+    updated = {**opt_params, "objective_functions": objs}
+    # (structure_name, type) -> matching objectives, so each override is one lookup.
+    index: Dict[Tuple[Any, Any], List[Dict[str, Any]]] = {}
+    for obj in objs:
+        index.setdefault((obj.get("structure_name"), obj.get("type")), []).append(obj)
     for ov in overrides:
-        struct = ov.get("structure_name")
-        obj_type = ov.get("type")
-        for obj in objs:
-            if obj.get("structure_name") == struct and obj.get("type") == obj_type:
-                if "weight" in ov:
-                    obj["weight"] = ov["weight"]
-                if "dose_gy" in ov:
-                    obj["dose_gy"] = ov["dose_gy"]
-                if "dose_perc" in ov:
-                    obj["dose_perc"] = ov["dose_perc"]
-    updated["objective_functions"] = objs
+        for obj in index.get((ov.get("structure_name"), ov.get("type")), ()):
+            if "weight" in ov:
+                obj["weight"] = ov["weight"]
+            if "dose_gy" in ov:
+                obj["dose_gy"] = ov["dose_gy"]
+            if "dose_perc" in ov:
+                obj["dose_perc"] = ov["dose_perc"]
     return updated
 
 
@@ -221,29 +237,47 @@ def _rebuild_linearized_objectives(opt, opt_params: Dict[str, Any], inf_matrix,
     A = inf_matrix.A
     st = inf_matrix
     x = opt.vars["x"]
-    opt.obj = []  # remove previous objective functions
+    objective_terms: List[Any] = []
+    constraints: List[Any] = []
+    # (voxel count, A rows) per structure; a structure often has several objectives and
+    # each row selection copies part of the influence matrix.
+    struct_rows: Dict[str, Tuple[int, Any]] = {}
+    structures = opt.my_plan.structures.get_structures()
     for obj in obj_funcs:
         obj_type = obj.get("type")
         struct = obj.get("structure_name")
-        if struct not in opt.my_plan.structures.get_structures():
+        if struct not in structures:
+            continue
+        if obj_type not in ("quadratic-overdose", "quadratic-underdose", "quadratic"):
+            # The notebook ignored other types (e.g., linear-overdose); we keep behavior consistent.
             continue
+        if struct not in struct_rows:
+            vox_idx = st.get_opt_voxels_idx(struct)
+            struct_rows[struct] = (len(vox_idx), _row_block(A, vox_idx))
+        num_vox, A_struct = struct_rows[struct]
         if obj_type == "quadratic-overdose":
             dose_gy = _resolve_obj_dose(opt, obj, clinical_criteria)
-            dO = cp.Variable(len(st.get_opt_voxels_idx(struct)), pos=True)
-            opt.obj += [(1 / len(st.get_opt_voxels_idx(struct))) * (obj["weight"] * cp.sum(dO))]
-            opt.constraints += [A[st.get_opt_voxels_idx(struct), :] @ x <= dose_gy + dO]
+            dO = cp.Variable(num_vox, pos=True)
+            objective_terms.append((1 / num_vox) * (obj["weight"] * cp.sum(dO)))
+            constraints.append(A_struct @ x <= dose_gy + dO)
         elif obj_type == "quadratic-underdose":
             dose_gy = _resolve_obj_dose(opt, obj, clinical_criteria)
-            dU = cp.Variable(len(st.get_opt_voxels_idx(struct)), pos=True)
-            opt.obj += [(1 / len(st.get_opt_voxels_idx(struct))) * (obj["weight"] * cp.sum(dU))]
-            opt.constraints += [A[st.get_opt_voxels_idx(struct), :] @ x >= dose_gy - dU]
-        elif obj_type == "quadratic":
-            opt.obj += [
-                (1 / len(st.get_opt_voxels_idx(struct))) * (obj["weight"] * cp.sum(A[st.get_opt_voxels_idx(struct), :] @ x))
-            ]
+            dU = cp.Variable(num_vox, pos=True)
+            objective_terms.append((1 / num_vox) * (obj["weight"] * cp.sum(dU)))
+            constraints.append(A_struct @ x >= dose_gy - dU)
         else:
-            # The notebook ignored other types (e.g., linear-overdose); we keep behavior consistent.
-            continue
+            objective_terms.append((1 / num_vox) * (obj["weight"] * cp.sum(A_struct @ x)))
+    opt.obj = objective_terms  # replaces the previous objective functions
+    opt.constraints.extend(constraints)
+
+
+def _row_block(A, rows):
+    """A[rows, :] in a layout CVXPY canonicalises cheaply: sorted-index CSR, or C-contiguous if dense."""
+    if isinstance(A, np.ndarray):
+        return np.ascontiguousarray(A[rows, :])
+    block = A[rows, :].tocsr()
+    block.sort_indices()
+    return block
 
 
 def _resolve_obj_dose(opt, obj: Dict[str, Any], clinical_criteria) -> float:
@@ -262,14 +296,21 @@ def _add_vmat_constraints(opt, my_plan, inf_matrix, mu_upper: float) -> Dict[str
     beam_maps = my_plan.inf_matrix.get_bev_2d_grid(beam_id=my_plan.beams.get_all_beam_ids())
     vmat_beams = []
     for beam_map in beam_maps:
-        beam_map = beam_map[~np.all(beam_map == -1, axis=1), :]  # remove rows which are not in BEV
+        # Remove rows which are not in BEV (all -1); a row max is one pass with no bool temporary.
+        beam_map = beam_map[beam_map.max(axis=1) >= 0, :]
         num_rows, num_cols = beam_map.shape
         leaf_idx_beamlet_map = {}
+        # Column of each leaf's beamlets in the BEV grid (beamlet ids are unique per map, so
+        # this is what np.where(np.isin(beam_map, beamlets))[1] gave, without a full-map scan).
+        leaf_idx_cols = {}
         for j, row in enumerate(beam_map):
-            leaf_idx_beamlet_map[j] = row[row >= 0].tolist()
+            in_leaf = row >= 0
+            leaf_idx_beamlet_map[j] = row[in_leaf].tolist()
+            leaf_idx_cols[j] = np.flatnonzero(in_leaf)
         vmat_beams.append(
             {
                 "leaf_idx_beamlet_map": leaf_idx_beamlet_map,
+                "leaf_idx_cols": leaf_idx_cols,
                 "num_rows": num_rows,
                 "num_cols": num_cols,
                 "beam_map": beam_map,
@@ -284,50 +325,61 @@ def _add_vmat_constraints(opt, my_plan, inf_matrix, mu_upper: float) -> Dict[str
     x = opt.vars["x"]
     U = mu_upper
 
+    # Collected locally and added to opt.constraints in one extend.
+    constraints: List[Any] = []
     leaf_in_prev_beam = 0
     for i, beam in enumerate(vmat_beams):
-        beam_map = beam["beam_map"]
         leaf_idx_beamlet_map = beam["leaf_idx_beamlet_map"]
+        leaf_idx_cols = beam["leaf_idx_cols"]
 
         for leaf in leaf_idx_beamlet_map:
             beamlets_in_leaf = leaf_idx_beamlet_map[leaf]
-            c = np.where(np.isin(beam_map, beamlets_in_leaf))
-
-            opt.constraints += [rbi[leaf_in_prev_beam + leaf] - cp.multiply(c[1] + 1, z[beamlets_in_leaf]) >= 1]
-            opt.constraints += [
-                cp.multiply((beam["num_cols"] - c[1]), z[beamlets_in_leaf])
-                + lbi[leaf_in_prev_beam + leaf]
-                <= beam["num_cols"]
-            ]
-            opt.constraints += [
-                cp.sum([z[b_i] for b_i in beamlets_in_leaf])
-                == rbi[leaf_in_prev_beam + leaf] - lbi[leaf_in_prev_beam + leaf] - 1
-            ]
-            opt.constraints += [rbi[leaf_in_prev_beam + leaf] <= beam["num_cols"]]
-
-            opt.constraints += [x[beamlets_in_leaf] <= U * z[beamlets_in_leaf]]
-            opt.constraints += [mu[i] - U * (1 - z[beamlets_in_leaf]) <= x[beamlets_in_leaf]]
-            opt.constraints += [x[beamlets_in_leaf] <= mu[i]]
+            cols = leaf_idx_cols[leaf]
+
+            constraints.extend(
+                (
+                    rbi[leaf_in_prev_beam + leaf] - cp.multiply(cols + 1, z[beamlets_in_leaf]) >= 1,
+                    cp.multiply((beam["num_cols"] - cols), z[beamlets_in_leaf])
+                    + lbi[leaf_in_prev_beam + leaf]
+                    <= beam["num_cols"],
+                    cp.sum([z[b_i] for b_i in beamlets_in_leaf])
+                    == rbi[leaf_in_prev_beam + leaf] - lbi[leaf_in_prev_beam + leaf] - 1,
+                    rbi[leaf_in_prev_beam + leaf] <= beam["num_cols"],
+                    x[beamlets_in_leaf] <= U * z[beamlets_in_leaf],
+                    mu[i] - U * (1 - z[beamlets_in_leaf]) <= x[beamlets_in_leaf],
+                    x[beamlets_in_leaf] <= mu[i],
+                )
+            )
 
         leaf_in_prev_beam = leaf_in_prev_beam + len(leaf_idx_beamlet_map)
-        opt.constraints += [mu[i] <= U]
-    opt.constraints += [lbi >= 0]
-    opt.constraints += [rbi >= 0]
+        constraints.append(mu[i] <= U)
+    constraints.append(lbi >= 0)
+    constraints.append(rbi >= 0)
+    opt.constraints.extend(constraints)
     return {"lbi": lbi, "rbi": rbi, "z": z, "mu": mu}
 
 
+def _map_structures(fn, items: List[Any]) -> List[Any]:
+    """fn over items on a thread pool (PortPy's NumPy indexing releases the GIL); serial for one item."""
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(8, len(items))) as pool:
+        return list(pool.map(fn, items))
+
+
 def _compute_dvh(my_plan, sol: Dict[str, Any], struct_names: List[str]) -> Dict[str, Any]:
     """Return DVH curves as arrays (Gy vs % volume)."""
     from portpy.photon.evaluation import Evaluation  # type: ignore
 
     dose_1d = sol["dose_1d"]
-    dvh = {}
-    for struct in struct_names:
-        if struct not in my_plan.structures.get_structures():
-            continue
+    available = set(my_plan.structures.get_structures())
+    structs = [struct for struct in struct_names if struct in available]
+
+    def one_structure(struct: str) -> Dict[str, Any]:
         x, y = Evaluation.get_dvh(sol, struct=struct, dose_1d=dose_1d)
-        dvh[struct] = {"dose_gy": x, "volume_perc": y * 100}
-    return dvh
+        return {"dose_gy": x, "volume_perc": y * 100}
+
+    return dict(zip(structs, _map_structures(one_structure, structs)))
 
 
 def _compute_metrics(my_plan, sol: Dict[str, Any], metrics_cfg: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -335,29 +387,35 @@ def _compute_metrics(my_plan, sol: Dict[str, Any], metrics_cfg: List[Dict[str, A
     from portpy.photon.evaluation import Evaluation  # type: ignore
 
     dose_1d = sol["dose_1d"]
-    metrics: Dict[str, Any] = {}
-    for item in metrics_cfg:
+    available = set(my_plan.structures.get_structures())
+    items = [item for item in metrics_cfg if item["structure"] in available]
+
+    def one_metric(item: Dict[str, Any]) -> Optional[Tuple[str, float]]:
         struct = item["structure"]
-        if struct not in my_plan.structures.get_structures():
-            continue
-        metrics.setdefault(struct, {})
         if item["type"] == "D":
             vol = item["volume_perc"]
             dose = Evaluation.get_dose(sol, struct=struct, volume_per=vol, dose_1d=dose_1d)
-            metrics[struct][f"D{vol}"] = float(dose)
-        elif item["type"] == "Dmean":
+            return f"D{vol}", float(dose)
+        if item["type"] == "Dmean":
             dose = Evaluation.get_mean_dose(sol, struct=struct, dose_1d=dose_1d)
-            metrics[struct]["Dmean"] = float(dose)
-        elif item["type"] == "Dmax":
+            return "Dmean", float(dose)
+        if item["type"] == "Dmax":
             dose = Evaluation.get_max_dose(sol, struct=struct, dose_1d=dose_1d)
-            metrics[struct]["Dmax"] = float(dose)
-        elif item["type"] == "Dcc":
+            return "Dmax", float(dose)
+        if item["type"] == "Dcc":
             vol_cc = item["volume_cc"]
             total_cc = my_plan.structures.get_volume_cc(struct)
             if total_cc > 0:
                 vol_per = vol_cc / total_cc * 100
                 dose = Evaluation.get_dose(sol, struct=struct, volume_per=vol_per, dose_1d=dose_1d)
-                metrics[struct][f"D{vol_cc}cc"] = float(dose)
+                return f"D{vol_cc}cc", float(dose)
+        return None
+
+    metrics: Dict[str, Any] = {}
+    for item, result in zip(items, _map_structures(one_metric, items)):
+        struct_metrics = metrics.setdefault(item["structure"], {})
+        if result is not None:
+            struct_metrics[result[0]] = result[1]
     return metrics
 
 
@@ -381,12 +439,16 @@ def _compute_clinical_criteria(my_plan, sol: Dict[str, Any], clinical_criteria)
         if df is None:
             return []
         df = df.where(pd.notnull(df), None)
-        table = df.to_dict(orient="records")
-        return json.loads(json.dumps(table))
+        return [{k: _norm(v) for k, v in rec.items()} for rec in df.to_dict(orient="records")]
     except Exception:
         return []
 
 
+def _norm(value: Any) -> Any:
+    """Plain Python value for a DataFrame cell (NumPy scalars -> int/float/bool/str)."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
 def _default_metrics_config() -> List[Dict[str, Any]]:
     """Key metrics for the lung case; UI can override."""
     return [
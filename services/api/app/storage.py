@@ -3,61 +3,163 @@ File-based storage for VMAT runs and PortPy caches.
 """
 from __future__ import annotations
 
+import atexit
+import datetime
 import hashlib
+import io
 import json
+import os
+import threading
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Deque, Dict, List, Tuple
 
 import numpy as np
 
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None
+
+try:
+    import xxhash  # type: ignore
+except Exception:
+    xxhash = None
+
+try:
+    import blosc2  # type: ignore
+except Exception:
+    blosc2 = None
+
 BASE_DATA_DIR = Path("data")
 PORTPY_CACHE_DIR = BASE_DATA_DIR / "portpy_cache"
 RUNS_DIR = BASE_DATA_DIR / "runs"
+OBJECTS_DIR = BASE_DATA_DIR / "objects"
+
+_ARTIFACT_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="artifacts")
+
+_B2_CPARAMS = (
+    {"codec": blosc2.Codec.ZSTD, "clevel": 1, "filters": [blosc2.Filter.BITSHUFFLE]} if blosc2 is not None else None
+)
+
+
+# Directories recently created or found, so repeat writes skip mkdir -p. Bounded LRU: one
+# entry per run directory would otherwise accumulate for the life of the process.
+_ENSURED_DIRS_SIZE = 256
+_ENSURED_DIRS: "OrderedDict[Path, None]" = OrderedDict()
+_ENSURED_LOCK = threading.Lock()
+
+
+def _ensure_dir(path: Path) -> None:
+    """mkdir -p, skipped for directories this process has recently created or found."""
+    with _ENSURED_LOCK:
+        if path in _ENSURED_DIRS:
+            _ENSURED_DIRS.move_to_end(path)
+            return
+    path.mkdir(parents=True, exist_ok=True)
+    with _ENSURED_LOCK:
+        _ENSURED_DIRS[path] = None
+        while len(_ENSURED_DIRS) > _ENSURED_DIRS_SIZE:
+            _ENSURED_DIRS.popitem(last=False)
+
+
+def _open_in_dir(path: Path, mode: str):
+    """
+    path.open(mode) after _ensure_dir(path.parent). If the directory was removed since it was
+    cached, the entry is dropped and the directory recreated with a plain mkdir -p.
+    """
+    _ensure_dir(path.parent)
+    try:
+        return path.open(mode)
+    except FileNotFoundError:
+        with _ENSURED_LOCK:
+            _ENSURED_DIRS.pop(path.parent, None)
+        _ensure_dir(path.parent)
+        return path.open(mode)
 
 
 def ensure_dirs() -> None:
     for path in [BASE_DATA_DIR, PORTPY_CACHE_DIR, RUNS_DIR]:
-        path.mkdir(parents=True, exist_ok=True)
+        _ensure_dir(path)
+
+
+def canonical_config(config: Dict[str, Any]) -> bytes:
+    """
+    Key-sorted, 2-space indented JSON bytes of a config, as hashed for run ids and written
+    as config.json, so the stored file stays readable and byte-identical for equal configs.
+    orjson does this in a few microseconds, cheaper than building any content key a memo
+    over configs would need.
+    """
+    if orjson is not None:
+        option = (
+            orjson.OPT_SORT_KEYS | orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+        return orjson.dumps(config, default=_json_default, option=option)
+    return json.dumps(config, sort_keys=True, indent=2, default=_json_default).encode("utf-8")
 
 
-def generate_run_id(config: Dict[str, Any]) -> str:
+def generate_run_id(config: Dict[str, Any], payload: bytes | None = None) -> str:
+    """Run id for a config; pass payload when canonical_config(config) is already at hand."""
     timestamp = time.strftime("%Y%m%dT%H%M%S")
-    payload = json.dumps(config, sort_keys=True, default=str)
-    h = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+    if payload is None:
+        payload = canonical_config(config)
+    # The tag only needs to be short and stable, not cryptographic: prefer xxh3 when available,
+    # else a 6-byte BLAKE2b digest (12 hex chars directly, no truncation of a longer hash).
+    if xxhash is not None:
+        h = xxhash.xxh3_64_hexdigest(payload)[:12]
+    else:
+        h = hashlib.blake2b(payload, digest_size=6).hexdigest()
     return f"{timestamp}-{h}"
 
 
 def run_dir(run_id: str) -> Path:
     ensure_dirs()
     path = RUNS_DIR / run_id
-    path.mkdir(parents=True, exist_ok=True)
+    _ensure_dir(path)
     return path
 
 
-def save_run_artifacts(run_id: str, payload: Dict[str, Any]) -> Dict[str, Path]:
+def save_run_artifacts(run_id: str, payload: Dict[str, Any], config_bytes: bytes | None = None) -> Dict[str, Path]:
+    """
+    Write a run's artifacts. config_bytes, when given, is canonical_config() of the config the
+    run used and is stored as config.json as-is rather than serialising config_used again.
+    """
     rd = run_dir(run_id)
     to_json = {
         "config": payload.get("config_used"),
         "solver_trace": payload.get("solver_trace"),
-        "dvh": payload.get("dvh"),
         "metrics": payload.get("metrics"),
         "clinical_criteria": payload.get("clinical_criteria"),
         "plan": payload.get("plan"),
     }
-    for name, data in to_json.items():
-        _write_json(rd / f"{name}.json", data)
+    # The artifact files are independent, so write them concurrently.
+    config = to_json.pop("config")
+    if config_bytes is None:
+        config_bytes = canonical_config(config)
+    futures = [_ARTIFACT_POOL.submit(_write_bytes_shared, rd / "config.json", config_bytes)]
+    # The remaining artifacts are specific to the run, so there is nothing to share.
+    futures += [_ARTIFACT_POOL.submit(_write_json, rd / f"{name}.json", data) for name, data in to_json.items()]
+    _schedule_object_gc()
+    dvh_future = _ARTIFACT_POOL.submit(_write_dvh, rd, payload.get("dvh"))
+    futures.append(dvh_future)
     dose_info = payload.get("dose", {})
     dose_array = dose_info.get("dose_1d")
     dose_3d = dose_info.get("dose_3d")
-    dose_path = None
-    dose3d_path = None
+    dose_future = None
+    dose3d_future = None
     if dose_array is not None:
-        dose_path = rd / "dose.npz"
-        np.savez_compressed(dose_path, dose_1d=dose_array)
+        dose_future = _ARTIFACT_POOL.submit(_save_dose, rd, "dose", dose_array)
+        futures.append(dose_future)
     if dose_3d is not None:
-        dose3d_path = rd / "dose_3d.npz"
-        np.savez_compressed(dose3d_path, dose_3d=dose_3d)
+        dose3d_future = _ARTIFACT_POOL.submit(save_dose_3d, run_id, dose_3d)
+        futures.append(dose3d_future)
+    for future in futures:
+        future.result()
+    dose_path = dose_future.result() if dose_future is not None else None
+    dose3d_path = dose3d_future.result() if dose3d_future is not None else None
+    # logs.json marks the run completed for pollers, so it goes last.
     logs_path = rd / "logs.json"
     _write_json(logs_path, {"status": "completed", "timestamp": time.time()})
     return {
@@ -66,102 +168,429 @@ def save_run_artifacts(run_id: str, payload: Dict[str, Any]) -> Dict[str, Path]:
         "dose3d_path": dose3d_path,
         "config_path": rd / "config.json",
         "metrics_path": rd / "metrics.json",
-        "dvh_path": rd / "dvh.json",
+        "dvh_path": dvh_future.result(),
         "logs_path": logs_path,
     }
 
 
+def save_dose_3d(run_id: str, dose_3d: Any) -> Path:
+    """Store a run's dose voxel grid (raw .npy by default; see _save_dose)."""
+    return _save_dose(run_dir(run_id), "dose_3d", dose_3d)
+
+
+def _save_dose(rd: Path, stem: str, arr: Any) -> Path:
+    """
+    Write rd/<stem>.npy (memory-mapped on read), or rd/<stem>.b2nd (zstd + bitshuffle chunks:
+    smaller on disk, decoded on each read) when PORTPY_DOSE_STORE=blosc2 and blosc2 is installed.
+    The other format is removed so a re-save never leaves a stale copy.
+    """
+    if os.getenv("PORTPY_DOSE_STORE", "npy").lower() == "blosc2" and blosc2 is not None:
+        path, stale = rd / f"{stem}.b2nd", rd / f"{stem}.npy"
+        _save_b2nd(path, arr)
+    else:
+        path, stale = rd / f"{stem}.npy", rd / f"{stem}.b2nd"
+        _save_npy(path, arr)
+    stale.unlink(missing_ok=True)
+    return path
+
+
+def _save_b2nd(path: Path, arr: Any) -> None:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    # blosc2 opens the file itself; a plain mkdir -p also covers a directory removed since cached.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        stored = blosc2.asarray(np.ascontiguousarray(arr), urlpath=str(tmp_path), mode="w", cparams=_B2_CPARAMS)
+        del stored
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _save_npy(path: Path, arr: Any) -> None:
+    """
+    np.save via a temp file + os.replace. Readers memory-map these files, so rewriting one in
+    place would truncate pages under a live mapping; a rename leaves old mappings intact.
+    """
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with _open_in_dir(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(arr))
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def load_dose_array(path: Path) -> np.ndarray:
+    """
+    Read a stored dose array: .npy is memory-mapped read-only and .b2nd is decompressed.
+    Legacy .npz runs are read in place (first member); nothing is written.
+    """
+    if path.suffix == ".b2nd":
+        if blosc2 is None:
+            raise RuntimeError(f"blosc2 is required to read {path}")
+        return blosc2.open(str(path))[:]
+    if path.suffix == ".npz":
+        with np.load(path, allow_pickle=False) as npz:
+            return npz[npz.files[0]]
+    # Plain ndarray view over the mapping (orjson serialises ndarray, not the memmap subclass).
+    return np.asarray(np.load(path, mmap_mode="r"))
+
+
+def _dose_file(rd: Path, names: set, stem: str) -> Path | None:
+    """Dose file for a run: .npy, then .b2nd, then the compressed .npz written by older versions."""
+    for suffix in (".npy", ".b2nd", ".npz"):
+        if f"{stem}{suffix}" in names:
+            return rd / f"{stem}{suffix}"
+    return None
+
+
 def load_run(run_id: str) -> Dict[str, Any]:
     rd = run_dir(run_id)
+    # One directory listing instead of an exists() probe per artifact.
+    try:
+        with os.scandir(rd) as it:
+            names = {entry.name for entry in it}
+    except FileNotFoundError:
+        names = set()
     data: Dict[str, Any] = {}
     for name in ["config", "solver_trace", "dvh", "metrics", "clinical_criteria", "plan", "logs"]:
-        path = rd / f"{name}.json"
-        if path.exists():
-            data[name] = _read_json(path)
-    dose_path = rd / "dose.npz"
-    if dose_path.exists():
-        with np.load(dose_path) as npz:
-            data["dose"] = {"dose_1d": npz["dose_1d"].tolist(), "path": str(dose_path)}
-    dose3d_path = rd / "dose_3d.npz"
-    if dose3d_path.exists():
-        with np.load(dose3d_path) as npz:
-            dose_entry = data.get("dose", {})
-            dose_entry["dose_3d_path"] = str(dose3d_path)
-            dose_entry["shape_3d"] = list(npz["dose_3d"].shape)
-            data["dose"] = dose_entry
+        if f"{name}.json" in names:
+            data[name] = read_json(rd / f"{name}.json")
+    if "dvh.npz" in names:
+        data["dvh"] = _load_dvh(rd / "dvh.npz")
+    dose_path = _dose_file(rd, names, "dose")
+    if dose_path is not None:
+        # Left as an ndarray; it becomes a JSON list only when a response serialises it.
+        data["dose"] = {"dose_1d": load_dose_array(dose_path), "path": str(dose_path)}
+    dose3d_path = _dose_file(rd, names, "dose_3d")
+    if dose3d_path is not None:
+        dose_entry = data.get("dose", {})
+        dose_entry["dose_3d_path"] = str(dose3d_path)
+        dose_entry["shape_3d"] = list(_dose_shape(dose3d_path))
+        data["dose"] = dose_entry
     return data
 
 
+_DVH_KEYS = ("dose_gy", "volume_perc")
+
+
+def _dvh_arrays(dvh: Any) -> Dict[str, np.ndarray] | None:
+    """npz members for {structure: {dose_gy, volume_perc}} curves, or None for any other shape."""
+    if not isinstance(dvh, dict) or not dvh:
+        return None
+    arrays = {"structures": np.array([str(name) for name in dvh])}
+    for i, curve in enumerate(dvh.values()):
+        if not isinstance(curve, dict) or set(curve) != set(_DVH_KEYS):
+            return None
+        for key in _DVH_KEYS:
+            try:
+                arr = np.asarray(curve[key], dtype=np.float64)
+            except (TypeError, ValueError):
+                return None
+            if arr.ndim != 1:
+                return None
+            arrays[f"{i}_{key}"] = arr
+    return arrays
+
+
+def _write_dvh(rd: Path, dvh: Any) -> Path:
+    """
+    Store DVH curves as an uncompressed dvh.npz (binary float64, no text formatting or
+    parsing). Anything that is not plain per-structure curves stays in dvh.json.
+    """
+    arrays = _dvh_arrays(dvh)
+    if arrays is None:
+        (rd / "dvh.npz").unlink(missing_ok=True)
+        _write_json(rd / "dvh.json", dvh)
+        return rd / "dvh.json"
+    path = rd / "dvh.npz"
+    tmp_path = rd / f".dvh.{os.getpid()}.{threading.get_ident()}.npz"
+    with _open_in_dir(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+    (rd / "dvh.json").unlink(missing_ok=True)
+    return path
+
+
+def _load_dvh(path: Path) -> Dict[str, Any]:
+    with np.load(path) as npz:
+        names = npz["structures"].tolist()
+        return {name: {key: npz[f"{i}_{key}"] for key in _DVH_KEYS} for i, name in enumerate(names)}
+
+
+def _dose_shape(path: Path) -> Tuple[int, ...]:
+    """Shape of a stored dose array; .b2nd is read from its header without decompressing."""
+    if path.suffix == ".b2nd" and blosc2 is not None:
+        return tuple(blosc2.open(str(path)).shape)
+    return load_dose_array(path).shape
+
+
+def load_run_status(run_id: str) -> str:
+    """Run status from logs.json alone, for polling endpoints that do not need the artifacts."""
+    path = RUNS_DIR / run_id / "logs.json"
+    if not path.exists():
+        return "unknown"
+    return (read_json(path) or {}).get("status", "unknown")
+
+
+class _BatchedAppender:
+    """
+    Appends lines to files from a background thread, one open/write per file per batch.
+    Solver output and progress arrive line by line; queuing them keeps file syscalls off
+    the pipe reader.
+    """
+
+    _RETRY_MAX_LINES = 10000
+
+    def __init__(self, interval_s: float = 0.05) -> None:
+        self._interval_s = interval_s
+        self._pending: Deque[Tuple[Path, str]] = deque()
+        self._wakeup = threading.Event()
+        self._drain_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        # Lines whose write failed, retried ahead of newer lines on the next flush.
+        self._retry: Dict[Path, List[str]] = {}
+
+    def append(self, path: Path, line: str) -> None:
+        self._pending.append((path, line))
+        if self._thread is None:
+            self._start()
+        self._wakeup.set()
+
+    def flush(self) -> None:
+        """
+        Write everything queued so far (readers call this before reading the file). Each file is
+        written on its own: a failed write is logged and its lines kept for the next flush
+        (up to _RETRY_MAX_LINES per file), without affecting other files or raising.
+        """
+        with self._drain_lock:
+            batches, self._retry = self._retry, {}
+            while self._pending:
+                path, line = self._pending.popleft()
+                batches.setdefault(path, []).append(line)
+            for path, lines in batches.items():
+                try:
+                    with _open_in_dir(path, "a") as f:
+                        f.write("\n".join(lines) + "\n")
+                except Exception as exc:  # noqa: BLE001
+                    kept = lines[-self._RETRY_MAX_LINES :]
+                    dropped = len(lines) - len(kept)
+                    note = f", dropped {dropped} oldest" if dropped else ""
+                    print(f"[storage] append to {path} failed, keeping {len(kept)} lines for retry{note}: {exc!r}")
+                    self._retry[path] = kept
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="batched-appender", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            # Let a burst of lines accumulate, then write it as one batch.
+            time.sleep(self._interval_s)
+            self._wakeup.clear()
+            self.flush()
+
+
+_LOG_APPENDER = _BatchedAppender()
+
+
 def append_log_line(run_id: str, message: str) -> None:
-    rd = run_dir(run_id)
-    path = rd / "run.log"
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a") as f:
-        f.write(message + "\n")
+    _LOG_APPENDER.append(RUNS_DIR / run_id / "run.log", message)
+
+
+def flush_logs() -> None:
+    _LOG_APPENDER.flush()
+
+
+def _tail_lines(path: Path, max_lines: int) -> List[str]:
+    """
+    Last max_lines lines of a file (endings kept, like readlines), reading only the tail.
+    Starts with ~64 bytes per wanted line and widens the window until enough lines are seen;
+    once the window would cover the whole file it is streamed through a bounded deque instead.
+    """
+    window = 64 * max(max_lines, 1)
+    with path.open("rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        while True:
+            start = max(0, size - window)
+            if start == 0:
+                f.seek(0)
+                lines = list(deque(f, maxlen=max_lines))
+                break
+            f.seek(start)
+            # Iterate the window like the file itself so both branches split on b"\n" only.
+            lines = list(io.BytesIO(f.read()))
+            if len(lines) > max_lines:
+                # The first line of the window may be cut off mid-line.
+                lines = lines[1:]
+                break
+            window *= 4
+    return [line.decode("utf-8", errors="replace") for line in lines[-max_lines:]]
 
 
 def load_log_lines(run_id: str, max_lines: int = 500) -> list[str]:
+    flush_logs()
     rd = run_dir(run_id)
     path = rd / "run.log"
     if not path.exists():
         return []
-    with path.open() as f:
-        lines = f.readlines()
-    return lines[-max_lines:]
+    return _tail_lines(path, max_lines)
+
+
+_PROGRESS_APPENDER = _BatchedAppender()
 
 
 def append_progress(run_id: str, payload: Dict[str, Any]) -> None:
-    rd = run_dir(run_id)
-    path = rd / "progress.jsonl"
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a") as f:
-        f.write(json.dumps(payload) + "\n")
+    line = orjson.dumps(payload).decode() if orjson is not None else json.dumps(payload)
+    _PROGRESS_APPENDER.append(RUNS_DIR / run_id / "progress.jsonl", line)
+
+
+def flush_progress() -> None:
+    _PROGRESS_APPENDER.flush()
 
 
 def load_progress(run_id: str, max_lines: int = 1000) -> list[Dict[str, Any]]:
+    flush_progress()
     rd = run_dir(run_id)
     path = rd / "progress.jsonl"
     if not path.exists():
         return []
-    with path.open() as f:
-        lines = f.readlines()
-    lines = lines[-max_lines:]
     out = []
-    for line in lines:
+    for line in _tail_lines(path, max_lines):
         line = line.strip()
         if not line:
             continue
         try:
-            out.append(json.loads(line))
+            out.append(orjson.loads(line) if orjson is not None else json.loads(line))
         except Exception:
             continue
     return out
 
 
 def save_case_manifest(case_id: str, manifest: Dict[str, Any]) -> Path:
-    case_dir = PORTPY_CACHE_DIR / "cases" / case_id
-    case_dir.mkdir(parents=True, exist_ok=True)
-    path = case_dir / "manifest.json"
+    path = PORTPY_CACHE_DIR / "cases" / case_id / "manifest.json"
     _write_json(path, manifest)
     return path
 
 
+def _json_default(obj: Any) -> Any:
+    """
+    Fallback encoder for values json/orjson cannot serialise natively. Values keep their JSON
+    type (NumPy bools/scalars via .item()) and sets are sorted, so canonical_config() output
+    is deterministic for hashing.
+    """
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        try:
+            return sorted(obj)
+        except TypeError:
+            return sorted(obj, key=repr)
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, os.PathLike):
+        return os.fspath(obj)
+    return str(obj)
+
+
+def _json_bytes(data: Any) -> bytes:
+    if orjson is not None:
+        # NumPy arrays/scalars are encoded natively; _json_default covers the rest
+        # (non-contiguous arrays, arbitrary objects).
+        option = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        return orjson.dumps(data, default=_json_default, option=option)
+    return json.dumps(data, indent=2, default=_json_default).encode("utf-8")
+
+
+def _replace_bytes(path: Path, blob: bytes) -> None:
+    """Write via a temp file + os.replace, so a hardlinked object is never modified in place."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with _open_in_dir(tmp_path, "wb") as f:
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+
 def _write_json(path: Path, data: Any) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    def _json_default(obj):
-        import numpy as np  # local import
-        if isinstance(obj, (np.integer,)):
-            return int(obj)
-        if isinstance(obj, (np.floating,)):
-            return float(obj)
-        if isinstance(obj, (np.ndarray,)):
-            return obj.tolist()
-        return str(obj)
-
-    with path.open("w") as f:
-        json.dump(data, f, indent=2, default=_json_default)
-
-
-def _read_json(path: Path) -> Any:
-    with path.open() as f:
-        return json.load(f)
+    _replace_bytes(path, _json_bytes(data))
+
+
+def _write_bytes_shared(path: Path, blob: bytes) -> None:
+    """
+    Write a run's config.json as a hardlink to a content-addressed copy under OBJECTS_DIR, so
+    configs repeated across runs (e.g. a sweep's retries) are stored once. Falls back to a
+    plain write (logged) where the object store or hardlinks are unavailable.
+    """
+    digest = hashlib.blake2b(blob, digest_size=16).hexdigest()
+    obj_path = OBJECTS_DIR / digest[:2] / f"{digest[2:]}.json"
+    _ensure_dir(path.parent)
+    try:
+        if not obj_path.exists():
+            _replace_bytes(obj_path, blob)
+        link_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.lnk")
+        os.link(obj_path, link_path)
+        os.replace(link_path, path)
+        # rename() is a no-op when path already links the same object; drop the spare link.
+        link_path.unlink(missing_ok=True)
+    except OSError as exc:
+        print(f"[storage] object store unavailable for {path}, writing directly: {exc!r}")
+        _replace_bytes(path, blob)
+
+
+# Objects younger than this are left alone by the GC: they may be between being written
+# and being linked into a run directory.
+_OBJECT_GC_MIN_AGE_S = 3600.0
+_OBJECT_GC_LOCK = threading.Lock()
+_OBJECT_GC_DONE = False
+
+
+def gc_objects(min_age_s: float = _OBJECT_GC_MIN_AGE_S) -> int:
+    """
+    Delete objects under OBJECTS_DIR that no run links to any more (link count 1, i.e. only
+    the store's own entry remains after their run directories were deleted). Returns the
+    number removed.
+    """
+    removed = 0
+    cutoff = time.time() - min_age_s
+    try:
+        shards = list(os.scandir(OBJECTS_DIR))
+    except FileNotFoundError:
+        return 0
+    for shard in shards:
+        if not shard.is_dir():
+            continue
+        with os.scandir(shard.path) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                    if st.st_nlink == 1 and st.st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                except OSError as exc:
+                    print(f"[storage] object gc skipped {entry.path}: {exc!r}")
+    return removed
+
+
+def _schedule_object_gc() -> None:
+    """Run gc_objects once per process, in the background, on the first artifact save."""
+    global _OBJECT_GC_DONE
+    with _OBJECT_GC_LOCK:
+        if _OBJECT_GC_DONE:
+            return
+        _OBJECT_GC_DONE = True
+    _ARTIFACT_POOL.submit(gc_objects)
+
+
+def read_json(path: Path) -> Any:
+    """Parse a JSON file (orjson when installed)."""
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    return json.loads(path.read_bytes())
@@ -1,5 +1,5 @@
 import { useEffect, useMemo, useState } from "react";
-import { fetchCtSlice, fetchDoseSlice, fetchRunDoseSlice, materializeRunDose } from "../lib/api";
+import { apiUrl, fetchCtSlice, fetchDoseSlice, fetchRunDoseSlice, materializeRunDose } from "../lib/api";
 import { DoseInfo } from "../lib/types";
 import styles from "./DoseViewer.module.css";
 
@@ -26,7 +26,7 @@ export default function DoseViewer({
 }: Props) {
   const [sliceIdx, setSliceIdx] = useState(60);
   const [ctSlice, setCtSlice] = useState<any | null>(null);
-  const [doseOverlay, setDoseOverlay] = useState<{ overlay_png: string; stats?: any } | null>(null);
+  const [doseOverlay, setDoseOverlay] = useState<{ overlay_url: string; stats?: any } | null>(null);
   const [loading, setLoading] = useState(false);
   const [overlayLoading, setOverlayLoading] = useState(false);
   const [materializing, setMaterializing] = useState(false);
@@ -80,10 +80,16 @@ export default function DoseViewer({
     if (dose?.stats?.mean_gy !== undefined && dose?.stats?.max_gy !== undefined) {
       return { max: dose.stats.max_gy, mean: dose.stats.mean_gy };
     }
-    if (!dose?.dose_1d || dose.dose_1d.length === 0) return null;
-    const max = dose.dose_1d.reduce((m, v) => (v > m ? v : m), Number.NEGATIVE_INFINITY);
-    const mean = dose.dose_1d.reduce((acc, v) => acc + v, 0) / dose.dose_1d.length;
-    return { max, mean };
+    const values = dose?.dose_1d;
+    if (!values || values.length === 0) return null;
+    let max = Number.NEGATIVE_INFINITY;
+    let sum = 0;
+    for (let i = 0; i < values.length; i++) {
+      const v = values[i];
+      if (v > max) max = v;
+      sum += v;
+    }
+    return { max, mean: sum / values.length };
   }, [dose]);
 
   return (
@@ -101,12 +107,12 @@ export default function DoseViewer({
         </div>
       </div>
       <div className={styles.viewport}>
-        {ctSlice?.image_png ? (
+        {ctSlice?.image_url ? (
           <div className={styles.readout}>
             <div className={styles.overlayWrap}>
-              <img className={styles.ctImage} src={ctSlice.image_png} alt={`CT slice ${sliceIdx}`} />
-              {doseOverlay?.overlay_png ? (
-                <img className={styles.overlayImage} src={doseOverlay.overlay_png} alt="Dose overlay" />
+              <img className={styles.ctImage} src={apiUrl(ctSlice.image_url)} alt={`CT slice ${sliceIdx}`} />
+              {doseOverlay?.overlay_url ? (
+                <img className={styles.overlayImage} src={apiUrl(doseOverlay.overlay_url)} alt="Dose overlay" />
               ) : null}
               {selectedPlanId && !selectedPlanIsReference ? (
                 <div className={styles.note}>Showing optimized dose overlay</div>
@@ -188,7 +194,7 @@ export default function DoseViewer({
               <div>Contours: {structures.slice(0, 4).join(", ") || "loading..."}</div>
               {dose?.path ? (
                 <a className={styles.download} href={dose.path} download>
-                  Download dose (npz)
+                  Download dose
                 </a>
               ) : null}
             </div>
@@ -1,8 +1,12 @@
-import { Objective, CaseManifest, RunArtifacts, RunStatus } from "./types";
+import { Objective, CaseManifest, DoseInfo, RunArtifacts, RunStatus } from "./types";
 import { RunSummary } from "./types";
 
 const API_BASE = process.env.NEXT_PUBLIC_API_BASE || "http://localhost:8000";
 
+export function apiUrl(path: string): string {
+  return `${API_BASE}${path}`;
+}
+
 async function http<T>(path: string, init?: RequestInit): Promise<T> {
   const res = await fetch(`${API_BASE}${path}`, {
     ...init,
@@ -34,8 +38,20 @@ export async function startOptimize(config: any): Promise<{ run_id: string; stat
   });
 }
 
+function decodeDose(dose: DoseInfo): DoseInfo {
+  if (!dose.dose_1d_b64) return dose;
+  const { dose_1d_b64, dose_1d_dtype, ...rest } = dose;
+  const bin = atob(dose_1d_b64);
+  const bytes = new Uint8Array(bin.length);
+  for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+  const dose_1d = dose_1d_dtype === "<f4" ? new Float32Array(bytes.buffer) : new Float64Array(bytes.buffer);
+  return { ...rest, dose_1d };
+}
+
 export async function fetchRun(runId: string): Promise<{ run_id: string; status: RunStatus; artifacts?: RunArtifacts; error?: string }> {
-  return http(`/runs/${runId}`);
+  const res = await http<{ run_id: string; status: RunStatus; artifacts?: RunArtifacts; error?: string }>(`/runs/${runId}`);
+  if (res.artifacts?.dose) res.artifacts.dose = decodeDose(res.artifacts.dose);
+  return res;
 }
 
 export async function fetchRunsList(caseId?: string): Promise<RunSummary[]> {
@@ -68,12 +84,12 @@ export async function fetchReferenceDose(caseId: string): Promise<RunArtifacts &
   return http(`/cases/${caseId}/reference_dose`);
 }
 
-export async function fetchDoseSlice(caseId: string, sliceIdx: number, thresholdGy?: number): Promise<{ slice_index: number; overlay_png: string; stats: any }> {
+export async function fetchDoseSlice(caseId: string, sliceIdx: number, thresholdGy?: number): Promise<{ slice_index: number; overlay_url: string; stats: any }> {
   const params = thresholdGy !== undefined ? `?threshold_gy=${encodeURIComponent(thresholdGy)}` : "";
   return http(`/cases/${caseId}/dose_slice/${sliceIdx}${params}`);
 }
 
-export async function fetchRunDoseSlice(runId: string, sliceIdx: number, thresholdGy?: number, materialize?: boolean): Promise<{ slice_index: number; overlay_png: string; stats: any }> {
+export async function fetchRunDoseSlice(runId: string, sliceIdx: number, thresholdGy?: number, materialize?: boolean): Promise<{ slice_index: number; overlay_url: string; stats: any }> {
   const parts: string[] = [];
   if (thresholdGy !== undefined) parts.push(`threshold_gy=${encodeURIComponent(thresholdGy)}`);
   if (materialize) parts.push("materialize=1");
@@ -28,7 +28,10 @@ export type CaseManifest = {
 export type RunStatus = "queued" | "running" | "completed" | "failed" | "unknown";
 
 export type DoseInfo = {
-  dose_1d?: number[];
+  dose_1d?: ArrayLike<number>;
+  // /runs/{id} sends dose_1d as base64 little-endian floats; fetchRun decodes it into dose_1d.
+  dose_1d_b64?: string;
+  dose_1d_dtype?: "<f4" | "<f8";
   path?: string;
   stats?: { mean_gy: number; max_gy: number; shape?: number[] };
   shape?: number[];